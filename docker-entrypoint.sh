@@ -0,0 +1,19 @@
+#!/bin/sh
+set -e
+
+# Use jemalloc for all allocations. Repeated large numpy/Torch buffers fragment
+# glibc malloc and grow RSS over time; PYTHONMALLOC=malloc routes CPython's
+# small-object allocations through it as well.
+JEMALLOC=$(ls /usr/lib/*-linux-gnu/libjemalloc.so.2 2>/dev/null | head -n 1)
+if [ -n "$JEMALLOC" ]; then
+    export LD_PRELOAD="$JEMALLOC${LD_PRELOAD:+:$LD_PRELOAD}"
+    export MALLOC_CONF="${MALLOC_CONF:-background_thread:true,dirty_decay_ms:0}"
+    export PYTHONMALLOC=malloc
+fi
+
+# Optionally run under SCHED_BATCH (throughput over latency for CPU-bound inference)
+if [ "${SCHED_BATCH:-false}" = "true" ]; then
+    exec chrt --batch 0 nice -n "${NICE_LEVEL:-0}" "$@"
+fi
+
+exec "$@"
@@ -1,13 +1,30 @@
-from fastapi import FastAPI, UploadFile, HTTPException
+from fastapi import FastAPI, UploadFile, HTTPException, Request, Response
+from fastapi.responses import FileResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 import logging
 import os
 from dotenv import load_dotenv
 import asyncio
+import anyio
+import concurrent.futures
+import itertools
+import stat
 import time
-from uvicorn.config import Config
+from dataclasses import asdict
+from contextlib import asynccontextmanager
+from prometheus_client import Gauge
+from prometheus_fastapi_instrumentator import Instrumentator
+from src.services.cache import InMemoryCache, RedisCache
+
+# Use uvloop when the app is embedded in a server that did not choose a loop itself
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
 
 # Load environment variables
 load_dotenv()
@@ -19,25 +36,148 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def connect_redis():
+    if os.getenv("USE_REDIS", "false").lower() != "true":
+        logger.info("Redis caching disabled")
+        return None
+
+    try:
+        import redis.asyncio as aioredis
+        logger.info("Setting up Redis cache")
+        pool = aioredis.BlockingConnectionPool(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", 6379)),
+            password=os.getenv("REDIS_PASSWORD", ""),
+            max_connections=int(os.getenv("REDIS_POOL_MAX", "32")),
+            timeout=5,
+            decode_responses=True
+        )
+        redis_client = aioredis.Redis(connection_pool=pool)
+        # Test connection
+        await redis_client.ping()
+        logger.info("Redis cache connected successfully")
+        return redis_client
+    except Exception as e:
+        logger.warning(f"Failed to connect to Redis: {str(e)}")
+        return None
+
+# Model availability gauges, set by set_model_status at startup and again once
+# model setup has (re)loaded the segmentation models
+SAM_GAUGE = Gauge("sam_available", "Whether the SAM predictor is loaded")
+YOLO_GAUGE = Gauge("yolo_available", "Whether the YOLOv8 model is loaded")
+REMBG_GAUGE = Gauge("rembg_available", "Whether rembg is importable for fallback segmentation")
+
+# Dedicated thread for blocking model setup (YOLOv8 loading) so it never
+# competes with asyncio.to_thread callers for the default executor
+MODEL_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-init")
+
+MODEL_SETUP_ATTEMPTS = 5
+
+async def load_segmentation_models():
+    # Load whatever the download just fetched into the live service and publish
+    # the new status; the service skips models that are already loaded
+    from src.routes import image_routes
+    loop = asyncio.get_running_loop()
+    status = await loop.run_in_executor(MODEL_EXECUTOR, image_routes.segmentation_service.load_models)
+    set_model_status(status)
+
+async def download_models():
+    # Retry with exponential backoff so a transient network error while fetching
+    # weights doesn't leave the app running without models
+    from src.setup.download_models import setup_models_async
+    for attempt in range(MODEL_SETUP_ATTEMPTS):
+        try:
+            await setup_models_async(executor=MODEL_EXECUTOR)
+            await load_segmentation_models()
+            app.state.ready = True
+            logger.info("Model setup completed")
+            return
+        except Exception as e:
+            if attempt == MODEL_SETUP_ATTEMPTS - 1:
+                logger.error(f"Error during model setup, giving up after {MODEL_SETUP_ATTEMPTS} attempts: {str(e)}")
+                # Still load whatever weights are present and report ready so
+                # /segment serves the fallback pipeline instead of answering 503
+                # forever; the failure stays visible under model_setup
+                await load_segmentation_models()
+                app.state.ready = True
+                raise
+            delay = 2 ** attempt
+            logger.warning(f"Error during model setup (attempt {attempt + 1}/{MODEL_SETUP_ATTEMPTS}), retrying in {delay}s: {str(e)}")
+            await asyncio.sleep(delay)
+
+def model_task_status() -> dict:
+    task = getattr(app.state, "model_task", None)
+    if task is None or not task.done():
+        return {"done": False, "error": None}
+    if task.cancelled():
+        return {"done": True, "error": "cancelled"}
+    error = task.exception()
+    return {"done": True, "error": str(error) if error else None}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Record app start time for uptime tracking
+    app.state.start_time = time.time()
+    # Flipped by download_models once the models are loaded, even if some
+    # downloads failed; /health/ready answers 503 until then so orchestrators
+    # hold traffic back
+    app.state.ready = False
+    app.state.model_executor = MODEL_EXECUTOR
+    app.state.redis = await connect_redis()
+    app.state.cache = RedisCache(app.state.redis) if app.state.redis is not None else InMemoryCache()
+
+    # Processed outputs are sharded by the first two hex digits of their job id
+    # so no single directory grows without bound
+    for shard in itertools.product("0123456789abcdef", repeat=2):
+        (UPLOAD_DIR / "processed" / "".join(shard)).mkdir(parents=True, exist_ok=True)
+
+    # Import routers here so they stay out of the module import graph; Torch,
+    # SAM and YOLO are only imported when download_models loads the models
+    from src.routes import image_routes
+    image_routes.segmentation_service.cache = app.state.cache
+    app.include_router(image_routes.router, prefix="/api/v1")
+    set_model_status(image_routes.SEGMENTATION_STATUS)
+
+    # Run model download in background to avoid blocking startup; keep a
+    # reference so failures stay observable from the readiness probe
+    app.state.model_task = asyncio.create_task(download_models())
+
+    yield
+
+    app.state.model_task.cancel()
+    await image_routes.composition_service.close_session()
+    if app.state.redis is not None:
+        await app.state.redis.aclose()
+    MODEL_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
 # Initialize the FastAPI app
 app = FastAPI(
     title="ProCaptions: AI-Powered Image Text Editor",
-    description="API for adding text behind image subjects using advanced AI segmentation"
+    description="API for adding text behind image subjects using advanced AI segmentation",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# Configure server timeout settings - INCREASED TIMEOUTS
-Config.TIMEOUT_KEEP_ALIVE = 300  # 5 minutes in seconds (increased from 120)
-Config.HTTP_TIMEOUT = 300        # 5 minutes in seconds (increased from 120)
-
 # Configure CORS
+# A concrete origin list lets browsers cache preflights (max_age); a bare "*"
+# is still allowed but then credentials must be disabled per the CORS spec.
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",") if origin.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
+    allow_origins=CORS_ORIGINS,
+    allow_credentials="*" not in CORS_ORIGINS,
+    allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
+    max_age=86400,
 )
 
+# Compress JSON bodies (health, listings); small responses are passed through untouched.
+# Added after CORS so it wraps the CORS middleware and compresses its responses too.
+app.add_middleware(GZipMiddleware, minimum_size=512)
+
+# Expose request latency histograms and the model gauges for Prometheus
+Instrumentator().instrument(app).expose(app, endpoint="/metrics", include_in_schema=False)
+
 # Create upload directories
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
@@ -46,107 +186,118 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 (UPLOAD_DIR / "temp").mkdir(exist_ok=True)
 (UPLOAD_DIR / "public").mkdir(exist_ok=True)
 
-# Mount static files directory for serving uploaded images
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-app.mount("/uploads/public", StaticFiles(directory="uploads/public"), name="public_uploads")
+class ImmutableStatic(StaticFiles):
+    """StaticFiles for uniquely named outputs that never change under the same URL"""
 
-# Initialize Redis cache if environment variable set
-try:
-    if os.getenv("USE_REDIS", "false").lower() == "true":
-        import redis
-        logger.info("Setting up Redis cache")
-        redis_client = redis.Redis(
-            host=os.getenv("REDIS_HOST", "localhost"),
-            port=int(os.getenv("REDIS_PORT", 6379)),
-            password=os.getenv("REDIS_PASSWORD", ""),
-            decode_responses=True
-        )
-        # Test connection
-        redis_client.ping()
-        logger.info("Redis cache connected successfully")
-    else:
-        redis_client = None
-        logger.info("Redis caching disabled")
-except Exception as e:
-    logger.warning(f"Failed to connect to Redis: {str(e)}")
-    redis_client = None
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
 
-# Import routers
-from src.routes import image_routes
+# Public outputs are mounted first - a "/uploads" mount registered before it
+# would otherwise match these paths and shadow it.
+app.mount("/uploads/public", ImmutableStatic(directory="uploads/public"), name="public_uploads")
 
-# Include routers
-app.include_router(image_routes.router, prefix="/api/v1")
+# Mount static files directory for serving uploaded images in development.
+# In production /uploads is served by serve_upload below, which answers
+# conditional GETs with 304 before touching the file contents.
+IS_PRODUCTION = os.getenv("ENVIRONMENT", "development").lower() == "production"
+if not IS_PRODUCTION:
+    app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
-# Download models on startup
-@app.on_event("startup")
-async def startup_event():
-    # Run model download in background to avoid blocking startup
-    asyncio.create_task(download_models())
+if IS_PRODUCTION:
+    @app.get("/uploads/{file_path:path}")
+    async def serve_upload(file_path: str, request: Request):
+        full_path = (UPLOAD_DIR / file_path).resolve()
+        if UPLOAD_DIR.resolve() not in full_path.parents:
+            raise HTTPException(status_code=404, detail="File not found")
 
-async def download_models():
+        try:
+            stat_result = await anyio.to_thread.run_sync(os.stat, full_path)
+        except (FileNotFoundError, NotADirectoryError):
+            raise HTTPException(status_code=404, detail="File not found")
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPException(status_code=404, detail="File not found")
+
+        etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=3600"}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+
+        return FileResponse(full_path, stat_result=stat_result, headers=headers)
+
+# Static skeleton of the readiness response; only the top-level keys are
+# replaced per request so a shallow copy is enough
+_HEALTH_TEMPLATE = {
+    "status": "healthy",
+    "timestamp": None,
+    "uptime": None,
+    "cache": {"redis": "disabled"},
+    "models": {
+        "sam_available": False,
+        "sam_device": "unknown",
+        "yolo_available": False,
+        "yolo_version": "unknown",
+        "rembg_available": False
+    },
+    "model_setup": {"done": False, "error": None}
+}
+
+# Cached model status snapshot, resolved on the first health probe and replaced
+# by set_model_status once the models have been (re)loaded after setup
+_model_status = None
+
+def set_model_status(status):
+    global _model_status
+    from src.routes import image_routes
+    image_routes.SEGMENTATION_STATUS = status
+    _model_status = asdict(status)
+    SAM_GAUGE.set(1 if status.sam_available else 0)
+    YOLO_GAUGE.set(1 if status.yolo_available else 0)
+    REMBG_GAUGE.set(1 if status.rembg_available else 0)
+
+def get_model_status():
+    global _model_status
+    if _model_status is None:
+        from src.routes.image_routes import SEGMENTATION_STATUS
+        _model_status = asdict(SEGMENTATION_STATUS)
+    return _model_status
+
+async def redis_status() -> str:
+    if app.state.redis is None:
+        return "disabled"
     try:
-        from src.setup.download_models import setup_models
-        await asyncio.to_thread(setup_models)
-        logger.info("Model setup completed")
+        # Keep a hung Redis from stalling the probe
+        await asyncio.wait_for(app.state.redis.ping(), timeout=0.25)
+        return "connected"
     except Exception as e:
-        logger.error(f"Error during model setup: {str(e)}")
+        logger.warning(f"Redis ping failed during readiness check: {str(e)}")
+        return "unavailable"
+
+# Liveness probe - process is up, no model or cache access
+@app.get("/health/live")
+async def liveness_check():
+    return {"status": "ok"}
 
-# Health check endpoint
+# Readiness probe - detailed model and cache status
+# (/health is kept as an alias for existing clients)
+@app.get("/health/ready")
 @app.get("/health")
 async def health_check():
-    # Get more detailed health information
-    health_info = {
-        "status": "healthy",
-        "timestamp": time.time(),
-        "uptime": time.time() - app.state.start_time if hasattr(app.state, "start_time") else None,
-        "cache": {
-            "redis": "connected" if redis_client else "disabled",
-        },
-        "models": {
-            "sam": {
-                "available": False,
-                "device": "unknown"
-            },
-            "yolo": {
-                "available": False,
-                "version": "unknown"
-            },
-            "rembg": {
-                "available": False
-            }
-        }
-    }
-    
-    # Import segmentation service to check model status
+    now = time.time()
+    health_info = _HEALTH_TEMPLATE.copy()
+    health_info["timestamp"] = now
+    health_info["uptime"] = now - app.state.start_time if hasattr(app.state, "start_time") else None
+    health_info["cache"] = {"redis": await redis_status()}
     try:
-        from src.routes.image_routes import segmentation_service
-        
-        # Check SAM availability
-        if hasattr(segmentation_service, "sam_predictor") and segmentation_service.sam_predictor is not None:
-            health_info["models"]["sam"]["available"] = True
-            # Get device info if possible
-            if hasattr(segmentation_service.sam_predictor.model, "device"):
-                health_info["models"]["sam"]["device"] = str(segmentation_service.sam_predictor.model.device)
-        
-        # Check YOLOv8 availability
-        if hasattr(segmentation_service, "yolo_model") and segmentation_service.yolo_model is not None:
-            health_info["models"]["yolo"]["available"] = True
-            # Get version info if possible
-            health_info["models"]["yolo"]["version"] = getattr(segmentation_service.yolo_model, "version", "unknown")
-        
-        # Check rembg availability
-        try:
-            from rembg import remove
-            health_info["models"]["rembg"]["available"] = True
-        except ImportError:
-            health_info["models"]["rembg"]["available"] = False
-            
+        health_info["models"] = get_model_status()
     except Exception as e:
         logger.error(f"Error checking model status: {str(e)}")
-    
-    return health_info
+    health_info["model_setup"] = model_task_status()
 
-# Record app start time for uptime tracking
-@app.on_event("startup")
-async def record_start_time():
-    app.state.start_time = time.time() 
\ No newline at end of file
+    if not getattr(app.state, "ready", False):
+        health_info["status"] = "starting"
+        return ORJSONResponse(status_code=503, content=health_info)
+    return health_info
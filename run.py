@@ -0,0 +1,22 @@
+import os
+import uvicorn
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+if __name__ == "__main__":
+    # Server settings must be passed to uvicorn.run - mutating uvicorn.config.Config
+    # class attributes has no effect on a server started this way.
+    # uvloop + httptools replace the asyncio event loop and the h11 parser with
+    # faster C implementations (both ship with uvicorn[standard]). uvloop is not
+    # available on Windows, so "auto" uses it when installed and asyncio otherwise.
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", 8000)),
+        timeout_keep_alive=300,  # 5 minutes in seconds
+        http="httptools",
+        loop="auto",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1"))
+    )
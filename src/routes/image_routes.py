@@ -1,7 +1,7 @@
 from fastapi import APIRouter, UploadFile, HTTPException
 from pathlib import Path
 import shutil
-from src.services.segmentation import SegmentationService
+from src.services.segmentation import SegmentationService, ModelStatus
 from src.services.composition import CompositionService, TextLayer
 from src.services.s3_service import S3Service
 from typing import Dict, Any, List, Optional
@@ -14,13 +14,25 @@ import base64
 import io
 import logging
 import glob
+import uuid
 
 router = APIRouter()
 segmentation_service = SegmentationService()
+# Model availability snapshot; nothing is loaded at import, main.py replaces it
+# once startup model setup has loaded the models in the background
+SEGMENTATION_STATUS: ModelStatus = ModelStatus(
+    sam_available=False,
+    sam_device="unknown",
+    yolo_available=False,
+    yolo_version="unknown",
+    rembg_available=False
+)
 composition_service = CompositionService()
 s3_service = S3Service()
 logger = logging.getLogger(__name__)
 
+PROCESSED_DIR = Path("uploads/processed")
+
 class DramaticTextRequest(BaseModel):
     background_path: str
     text: str
@@ -75,12 +87,19 @@ class MultiLayerTextRequest(BaseModel):
 
 @router.post("/segment")
 async def segment_image(file: UploadFile) -> Dict[str, str]:
+    if not segmentation_service.models_loaded:
+        raise HTTPException(status_code=503, detail="Segmentation models are still loading")
+
     try:
         # Log request information
         logger.info(f"Segmentation request received for file: {file.filename}")
         
+        # Name outputs after a job id and shard them by its first two hex digits
+        job_id = uuid.uuid4().hex
+        output_dir = PROCESSED_DIR / job_id[:2]
+
         # Save temporary file
-        temp_path = Path("uploads/original") / file.filename
+        temp_path = Path("uploads/original") / f"{job_id}{Path(file.filename or '').suffix}"
         async with aiofiles.open(temp_path, 'wb') as out_file:
             content = await file.read()
             await out_file.write(content)
@@ -88,7 +107,7 @@ async def segment_image(file: UploadFile) -> Dict[str, str]:
         logger.info(f"File saved to temporary path: {temp_path}")
 
         # Process with segmentation service
-        fore_path, back_path, mask_path = await segmentation_service.segment_image(temp_path)
+        fore_path, back_path, mask_path = await segmentation_service.segment_image(temp_path, output_dir=output_dir)
         logger.info(f"Segmentation successful: foreground={fore_path}, background={back_path}, mask={mask_path}")
 
         # Upload to S3
@@ -0,0 +1,51 @@
+from typing import Optional, Protocol
+from cachetools import TLRUCache
+
+class Cache(Protocol):
+    """Async key/value cache shared by the services (Redis or in-process)"""
+
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        ...
+
+    async def delete(self, key: str) -> None:
+        ...
+
+class RedisCache:
+    """Cache backed by the shared redis.asyncio client"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self.client.setex(key, ttl, value)
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+class InMemoryCache:
+    """
+    Per-process fallback used when Redis is disabled or unreachable.
+    Entries expire after their own ttl; the least recently used entry is
+    evicted once maxsize is reached.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: int = 3600):
+        self.default_ttl = ttl
+        # Values are stored as (value, ttl) so each entry can carry its own expiry
+        self._store = TLRUCache(maxsize=maxsize, ttu=lambda key, item, now: now + item[1])
+
+    async def get(self, key: str) -> Optional[str]:
+        item = self._store.get(key)
+        return item[0] if item is not None else None
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        self._store[key] = (value, ttl or self.default_ttl)
+
+    async def delete(self, key: str) -> None:
+        self._store.pop(key, None)
@@ -1,7 +1,6 @@
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
+from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance, ImageColor
 import numpy as np
 from typing import Dict, List, Tuple, Optional, Any, Union
-import requests
 from io import BytesIO
 from src.services.s3_service import S3Service
 import os
@@ -14,11 +13,690 @@ import time
 import tempfile
 import aiofiles
 import aiohttp
+import asyncio
 import urllib.parse
+import functools
+import itertools
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+# Numba is optional: when installed on a machine with enough cores, full-frame
+# compositing runs as a parallel JIT kernel. Single-threaded, Pillow's C loop is
+# faster, so below four threads Image.alpha_composite is used instead
+try:
+    import numba
+except ImportError:
+    numba = None
+
+if numba is not None and numba.config.NUMBA_NUM_THREADS >= 4:
+    @numba.njit(parallel=True, cache=True)
+    def _alpha_over(bg, fg, out):
+        """Porter-Duff 'over' of straight-alpha RGBA uint8 arrays in integer arithmetic"""
+        height, width = bg.shape[0], bg.shape[1]
+        for y in numba.prange(height):
+            for x in range(width):
+                fa = np.int64(fg[y, x, 3])
+                if fa == 255:
+                    for c in range(4):
+                        out[y, x, c] = fg[y, x, c]
+                elif fa == 0:
+                    for c in range(4):
+                        out[y, x, c] = bg[y, x, c]
+                elif bg[y, x, 3] == 255:
+                    # Opaque destination (the usual photo background): the blend
+                    # fg*fa + bg*(255-fa) fits in 16 bits, and t/255 rounds exactly
+                    # as (t + 128 + ((t + 128) >> 8)) >> 8, so no division at all
+                    ba = 255 - np.int32(fa)
+                    for c in range(3):
+                        t = np.int32(fg[y, x, c]) * np.int32(fa) + np.int32(bg[y, x, c]) * ba + 128
+                        out[y, x, c] = (t + (t >> 8)) >> 8
+                    out[y, x, 3] = 255
+                else:
+                    # Destination coverage left visible under the foreground, and
+                    # the resulting alpha, both scaled by 255
+                    da = np.int64(bg[y, x, 3]) * (255 - fa)
+                    oa = fa * 255 + da
+                    # One division per pixel: a 24-bit fixed-point reciprocal of the
+                    # output alpha replaces a divide per channel
+                    inv = (np.int64(1) << 24) // oa
+                    fw = fa * 255
+                    for c in range(3):
+                        out[y, x, c] = (np.int64(fg[y, x, c]) * fw + np.int64(bg[y, x, c]) * da) * inv + (1 << 23) >> 24
+                    out[y, x, 3] = (oa + 127) // 255
+else:
+    _alpha_over = None
+
+def _composite_over(background: np.ndarray, foreground: Image.Image) -> Image.Image:
+    """
+    Alpha-composite a same-size RGBA image over a writable RGBA array. The Numba
+    kernel writes the result back into the array's own buffer. Pillow's in-place
+    Image.alpha_composite method would still build a temporary result and paste
+    it back, so the fallback uses the module function and its single allocation.
+    """
+    if _alpha_over is None:
+        return Image.alpha_composite(Image.fromarray(background, 'RGBA'), foreground)
+    if not background.flags.writeable:
+        background = background.copy()
+    _alpha_over(background, np.asarray(foreground), background)
+    return Image.fromarray(background, 'RGBA')
+
+# Output names are unique per process without a clock read per file: a counter,
+# tagged with the PID and start time so workers and restarts never collide
+_name_counter = itertools.count()
+
+# Upper bound on S3 uploads in flight from one service instance
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+_PROCESS_TAG = f"{os.getpid()}-{int(time.time())}"
+
+# Blocking PNG encodes and S3 uploads run here so the event loop keeps serving; one
+# pool per process, shared by every service instance and request
+_IO_POOL = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="composition-io")
+
+# Also write composed outputs to disk; normally they are encoded in memory and uploaded
+SAVE_LOCAL_OUTPUTS = os.getenv("SAVE_LOCAL_OUTPUTS", "false").lower() == "true"
+
+@functools.lru_cache(maxsize=256)
+def _load_font(font_file: str, font_size: int, fonts_dir: str) -> ImageFont.FreeTypeFont:
+    """
+    Load a font by file name (looked up in fonts_dir first) or system font name.
+    Cached because parsing a TTF and setting up the FreeType face is costly and
+    the resulting font objects are reusable across draws.
+    
+    Raises if the font cannot be loaded. lru_cache does not cache exceptions, so a
+    font that only appears later (e.g. once the startup download finishes) is
+    picked up on the next call instead of a fallback being kept for good.
+    """
+    # If it's a local file name, try to load it from our fonts directory
+    if font_file.endswith('.ttf') or font_file.endswith('.otf'):
+        font_path = Path(fonts_dir) / font_file
+        if font_path.exists():
+            return ImageFont.truetype(str(font_path), font_size)
+    
+    # Otherwise assume it's a system font
+    return ImageFont.truetype(font_file, font_size)
+
+def _fallback_font(font_size: int, fonts_dir: str) -> ImageFont.FreeTypeFont:
+    """Arial if the system has it, else Pillow's built-in default font"""
+    try:
+        return _load_font("Arial", font_size, fonts_dir)
+    except Exception:
+        return ImageFont.load_default()
+
+def _text_size(font: ImageFont.FreeTypeFont, text: str) -> Tuple[int, int]:
+    """Width and height of text's ink box as ImageDraw lays it out"""
+    left, top, right, bottom = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), text, font=font)
+    return right - left, bottom - top
+
+@functools.lru_cache(maxsize=1024)
+def _measure_text(font_file: str, font_size: int, fonts_dir: str, text: str) -> Tuple[int, int]:
+    """
+    _text_size for a font as loaded by _load_font. Cached since the same text is
+    measured on every suggestion and preview request; like _load_font it raises
+    for a font that cannot be loaded, so no fallback metrics are ever cached.
+    """
+    return _text_size(_load_font(font_file, font_size, fonts_dir), text)
+
+@functools.lru_cache(maxsize=256)
+def _hex_to_rgba(hex_color: str, opacity: float = 1.0) -> Tuple[int, int, int, int]:
+    """
+    Convert a #RRGGBBAA, #RRGGBB, #RGBA or #RGB color to an RGBA tuple with its
+    alpha scaled by opacity, falling back to white for anything else. Cached
+    since callers reuse a small palette.
+    """
+    if not hex_color.startswith('#'):
+        return (255, 255, 255, int(255 * opacity))
+    
+    digits = hex_color[1:]
+    if len(digits) in (3, 4):
+        # Short forms: expand each nibble to a full byte
+        digits = ''.join(c * 2 for c in digits)
+    if len(digits) == 6:
+        digits += 'FF'
+    elif len(digits) != 8:
+        return (255, 255, 255, int(255 * opacity))
+    
+    v = int(digits, 16)
+    return ((v >> 24) & 0xFF, (v >> 16) & 0xFF, (v >> 8) & 0xFF, int((v & 0xFF) * opacity))
+
+# Formats and modes OpenCV decodes to the same pixels as PIL's convert('RGBA')
+_CV2_DECODE_FORMATS = frozenset({"PNG", "JPEG", "WEBP", "BMP"})
+_CV2_DECODE_MODES = frozenset({"1", "L", "LA", "P", "RGB", "RGBA"})
+
+def _decode_rgba(content: bytes) -> np.ndarray:
+    """
+    Decode encoded image bytes straight to an 8-bit RGBA array with OpenCV, skipping
+    PIL's pixel decode. Only 8-bit PNG/JPEG/WebP/BMP images take this path (PIL reads
+    just the header to check); anything else - 16-bit PNGs, TIFFs, CMYK JPEGs, and
+    grayscale PNGs with a tRNS key, which OpenCV drops - is converted by PIL so the
+    result always matches Image.convert('RGBA').
+    """
+    image = Image.open(BytesIO(content))
+    gray_key = image.mode in ("1", "L") and "transparency" in image.info
+    arr = None
+    if image.format in _CV2_DECODE_FORMATS and image.mode in _CV2_DECODE_MODES and not gray_key:
+        arr = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_UNCHANGED)
+    if arr is None or arr.dtype != np.uint8 or (arr.ndim == 3 and arr.shape[2] not in (1, 3, 4)):
+        return np.asarray(image.convert('RGBA'))
+    
+    if arr.ndim == 2 or arr.shape[2] == 1:
+        return cv2.cvtColor(arr, cv2.COLOR_GRAY2RGBA)
+    if arr.shape[2] == 4:
+        return cv2.cvtColor(arr, cv2.COLOR_BGRA2RGBA)
+    return cv2.cvtColor(arr, cv2.COLOR_BGR2RGBA)
+
+# Social media template sizes (width, height); unknown names default to square
+_TEMPLATE_DIMS = {
+    "instagram_post": (1080, 1080),
+    "instagram_story": (1080, 1920),
+    "facebook_post": (1200, 630),
+    "twitter_post": (1600, 900),
+    "linkedin_post": (1200, 627),
+    "youtube_thumbnail": (1280, 720),
+    "tiktok_video": (1080, 1920)
+}
+
+@functools.lru_cache(maxsize=128)
+def _template_layout(template_name: str, padding_percent: int) -> Tuple[int, int, int, int, int]:
+    """(width, height, padding_px, avail_width, avail_height) for a template and padding"""
+    width, height = _TEMPLATE_DIMS.get(template_name, (1080, 1080))
+    padding_px = min(width, height) * padding_percent // 100
+    return width, height, padding_px, width - 2 * padding_px, height - 2 * padding_px
+
+_RESAMPLE_FILTERS = {
+    "lanczos": Image.Resampling.LANCZOS,
+    "bicubic": Image.Resampling.BICUBIC,
+    "bilinear": Image.Resampling.BILINEAR
+}
+
+def _pick_resample(resample_filter: Optional[str], src_size: Tuple[int, int], dst_size: Tuple[int, int]) -> int:
+    """
+    Map a filter name to a PIL resampling filter. With no explicit choice, use LANCZOS
+    unless shrinking by more than 2x, where BICUBIC looks the same and is much cheaper.
+    """
+    if resample_filter is not None:
+        if resample_filter.lower() not in _RESAMPLE_FILTERS:
+            raise ValueError(f"Unknown resample filter: {resample_filter}")
+        return _RESAMPLE_FILTERS[resample_filter.lower()]
+    if src_size[0] > 2 * dst_size[0] and src_size[1] > 2 * dst_size[1]:
+        return Image.Resampling.BICUBIC
+    return Image.Resampling.LANCZOS
+
+def _resize_rgba(arr: np.ndarray, size: Tuple[int, int]) -> Image.Image:
+    """
+    Resize an RGBA array. Downscales use OpenCV's INTER_AREA on premultiplied
+    colour (as PIL does) so the RGB of fully transparent pixels cannot bleed into
+    the subject's edges; upscales keep PIL's LANCZOS, which OpenCV has no faster
+    equivalent for.
+    """
+    image = Image.fromarray(arr, 'RGBA')
+    if size[0] >= image.width or size[1] >= image.height:
+        return image.resize(size, Image.Resampling.LANCZOS)
+    premultiplied = np.asarray(image.convert('RGBa'))
+    resized = cv2.resize(premultiplied, size, interpolation=cv2.INTER_AREA)
+    return Image.fromarray(resized, 'RGBa').convert('RGBA')
+
+# JPEG reduced-scale decode flags, largest reduction first; EXIF orientation is
+# ignored to match the full decode (IMREAD_UNCHANGED) and PIL
+_REDUCED_JPEG_READS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8 | cv2.IMREAD_IGNORE_ORIENTATION),
+    (4, cv2.IMREAD_REDUCED_COLOR_4 | cv2.IMREAD_IGNORE_ORIENTATION),
+    (2, cv2.IMREAD_REDUCED_COLOR_2 | cv2.IMREAD_IGNORE_ORIENTATION)
+)
+
+def _load_rgba(path: Union[str, Path], target_size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """
+    Load an image file as an 8-bit RGBA array via OpenCV.
+    
+    When the caller will shrink the image to target_size anyway, JPEGs are decoded
+    at the largest 1/2, 1/4 or 1/8 DCT scale that stays at least that big.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    
+    if target_size is not None and content[:2] == b'\xff\xd8':
+        # Only the JPEG header is parsed here
+        with Image.open(BytesIO(content)) as header:
+            width, height = header.size
+        for factor, flags in _REDUCED_JPEG_READS:
+            if width // factor >= target_size[0] and height // factor >= target_size[1]:
+                arr = cv2.imdecode(np.frombuffer(content, np.uint8), flags)
+                if arr is not None:
+                    return cv2.cvtColor(arr, cv2.COLOR_BGR2RGBA)
+                break
+    
+    return _decode_rgba(content)
+
+def _extract_xy(position: Any) -> Tuple[int, int]:
+    """Read x, y from a {'x', 'y'} dict or an (x, y) sequence, falling back to (0, 0)"""
+    try:
+        return int(position['x']), int(position['y'])
+    except (TypeError, KeyError, IndexError):
+        pass
+    try:
+        x, y = position
+        return int(x), int(y)
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid position format: {position}, using (0, 0)")
+        return 0, 0
+
+def _score_regions(sat: np.ndarray, boxes: np.ndarray, channels: int = 1) -> np.ndarray:
+    """
+    Mean value of each (x0, y0, x1, y1) box, read from a summed-area table padded with a
+    leading zero row and column. Boxes with no area score 0.
+    """
+    x0, y0, x1, y1 = boxes.T
+    sums = sat[y1, x1] - sat[y0, x1] - sat[y1, x0] + sat[y0, x0]
+    area = (x1 - x0) * (y1 - y0) * channels
+    return np.where(area > 0, sums / np.maximum(area, 1), 0.0)
+
+# Side in pixels of the blocks suggest_text_positions averages large backgrounds into
+_STATS_BLOCK = 16
+
+def _block_means(bg_array: np.ndarray, block: int) -> np.ndarray:
+    """
+    Mean of the scored plane (alpha if present, else all channels) over each
+    block x block tile, via a reshape. Pixels past the last whole tile are dropped.
+    """
+    rows, cols = bg_array.shape[0] // block, bg_array.shape[1] // block
+    tiles = bg_array[:rows * block, :cols * block]
+    if bg_array.shape[2] == 4:
+        return tiles[:, :, 3].reshape(rows, block, cols, block).mean(axis=(1, 3))
+    return tiles.reshape(rows, block, cols, block, -1).mean(axis=(1, 3, 4))
+
+def _freeze(value: Any) -> Any:
+    """
+    Convert nested effect dicts/lists into hashable frozensets/tuples for cache keys.
+    Already-frozen values pass through unchanged, so a frozen preset can be handed
+    anywhere an effects dict is accepted.
+    """
+    if isinstance(value, dict):
+        return frozenset((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value: Any) -> Any:
+    """Inverse of _freeze; lists come back as tuples, which the effect code accepts"""
+    if isinstance(value, frozenset):
+        return {key: _thaw(item) for key, item in value}
+    if isinstance(value, tuple):
+        return tuple(_thaw(item) for item in value)
+    return value
+
+def _render_glyph_mask(text: str, font: ImageFont.FreeTypeFont) -> Tuple[Image.Image, Tuple[int, int]]:
+    """
+    Rasterize text once into an 'L' coverage mask.
+    
+    Returns the mask and its (left, top) offset from the draw origin, so pasting a
+    color through it at origin + offset matches draw.text at origin.
+    """
+    # Measure through ImageDraw so multiline text gets the same layout as draw.text
+    mask = Image.new('L', (1, 1), 0)
+    left, top, right, bottom = ImageDraw.Draw(mask).textbbox((0, 0), text, font=font)
+    mask = Image.new('L', (max(right - left, 1), max(bottom - top, 1)), 0)
+    ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font)
+    return mask, (left, top)
+
+def _composite_layer(canvas: Image.Image, layer: Image.Image, x: int, y: int) -> None:
+    """
+    Alpha-composite an RGBA layer onto the canvas with its top-left at (x, y),
+    clipping whatever part of the layer falls outside the canvas.
+    """
+    src_x, src_y = max(0, -x), max(0, -y)
+    right = min(layer.width, canvas.width - x)
+    bottom = min(layer.height, canvas.height - y)
+    if right <= src_x or bottom <= src_y:
+        return
+    canvas.alpha_composite(layer, (x + src_x, y + src_y), (src_x, src_y, right, bottom))
+
+def _fill_mask(canvas: Image.Image, fill: Any, mask: Image.Image, x: int, y: int) -> None:
+    """
+    Alpha-composite a solid fill through a coverage mask onto the canvas at (x, y).
+    Unlike canvas.paste(fill, box, mask) this respects the canvas's own alpha, so
+    text stacked on a partly transparent shadow or glow edge gets no dark fringe.
+    """
+    rgba = ImageColor.getcolor(fill, 'RGBA') if isinstance(fill, str) else tuple(fill)
+    if len(rgba) == 3:
+        rgba += (255,)
+    layer = Image.new('RGBA', mask.size, rgba)
+    layer.putalpha(mask if rgba[3] == 255 else mask.point(lambda v: v * rgba[3] // 255))
+    _composite_layer(canvas, layer, x, y)
+
+def _blurred_text_layer(mask: Image.Image, fill: Tuple[int, int, int, int], radius: float) -> Tuple[Image.Image, int]:
+    """
+    Build a Gaussian-blurred RGBA copy of a glyph mask tinted with fill.
+    
+    The mask is padded by three blur radii so the falloff is not clipped; the
+    padding is returned so callers can offset the layer back into place.
+    """
+    pad = int(math.ceil(radius * 3))
+    alpha = Image.new('L', (mask.width + 2 * pad, mask.height + 2 * pad), 0)
+    alpha.paste(mask, (pad, pad))
+    alpha = alpha.filter(ImageFilter.GaussianBlur(radius))
+    alpha = alpha.point(lambda v: v * fill[3] // 255)
+    
+    layer = Image.new('RGBA', alpha.size, fill)
+    layer.putalpha(alpha)
+    return layer, pad
+
+def _effect_margin(effects: Optional[Dict[str, Any]]) -> int:
+    """Upper bound, in pixels, on how far effects reach outside the text's bounding box"""
+    if not effects:
+        return 0
+    
+    if 'type' not in effects:
+        # Legacy format only supports a hard shadow
+        if 'shadow' not in effects:
+            return 0
+        offset = effects['shadow'].get('offset', (5, 5))
+        return int(max(abs(offset[0]), abs(offset[1]))) + 1
+    
+    effect_type = effects.get('type')
+    settings = effects.get('settings', {})
+    if effect_type == 'shadow':
+        offset = settings.get('offset', [5, 5])
+        if not (isinstance(offset, (list, tuple)) and len(offset) >= 2):
+            offset = (5, 5)
+        blur_pad = math.ceil(max(settings.get('blur', 3), 0) * 3)
+        return int(max(abs(offset[0]), abs(offset[1])) + blur_pad) + 1
+    if effect_type == 'outline':
+        return int(settings.get('width', 2)) + 1
+    if effect_type == 'glow':
+        return int(math.ceil(settings.get('radius', 10) * 3)) + 1
+    if effect_type == '3d_depth':
+        return int(settings.get('layers', 10) * abs(settings.get('distance', 2))) + 1
+    return 0
+
+def _apply_text_effects(
+    canvas: Image.Image,
+    text: str,
+    position: Tuple[int, int],
+    font: ImageFont.FreeTypeFont,
+    color: str = "#FFFFFF",
+    effects: Dict[str, Any] = None
+) -> None:
+    """
+    Apply text with visual effects to the image.
+    
+    Args:
+        canvas: Image to draw on
+        text: Text to draw
+        position: (x, y) position
+        font: Font to use
+        color: Text color in hex format
+        effects: Dictionary with text effects settings
+    """
+    # Log all input parameters for debugging
+    logger.info("_apply_text_effects: text=%r, position=%s, font=%s, color=%s", text, position, font, color)
+    logger.info("Effects: %s", effects)
+    
+    draw = ImageDraw.Draw(canvas)
+    
+    # Get bounding box of the text to properly center it
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    text_width = right - left
+    text_height = bottom - top
+    
+    logger.debug("Text bounding box: width=%d, height=%d", text_width, text_height)
+    
+    # Convert an (x, y) tuple or {'x', 'y'} dict (from frontend) to coordinates
+    x, y = _extract_xy(position)
+            
+    logger.debug("Original position: x=%d, y=%d", x, y)
+            
+    # Apply the ORIGINAL positioning logic that worked correctly
+    # 1. Center horizontally
+    centered_x = x - text_width // 2
+    
+    # 2. Apply the vertical adjustment factor that matches CSS rendering
+    # This factor (0.375 or 37.5%) was calibrated to match frontend preview
+    vertical_adjustment_factor = 0.375
+    vertical_adjustment = int(text_height * vertical_adjustment_factor)
+    
+    # 3. Center vertically and apply the adjustment
+    centered_y = y - text_height // 2 - vertical_adjustment
+    
+    logger.debug(
+        "Adjusted position: x=%d, y=%d (with %dpx vertical adjustment)",
+        centered_x, centered_y, vertical_adjustment
+    )
+    
+    # If no effects specified or effects is None, just draw the text
+    if not effects:
+        logger.debug("No effects specified, drawing plain text")
+        _effect_plain(canvas, text, font, centered_x, centered_y, color, {})
+        return
+    
+    # Check if it's the legacy format (direct keys) or new format (type + settings)
+    if 'type' in effects:
+        # Process the new unified effects format
+        effect_type = effects.get('type')
+        settings = effects.get('settings', {})
+        
+        logger.debug("Using new effects format: type=%s", effect_type)
+        
+        effect = _EFFECT_DISPATCH.get(effect_type)
+        if effect is None:
+            # Unknown effect type, just draw plain text
+            logger.warning("Unknown effect type: %s, drawing plain text", effect_type)
+            effect = _effect_plain
+        effect(canvas, text, font, centered_x, centered_y, color, settings)
+    else:
+        # Legacy format (for backward compatibility)
+        logger.debug("Using legacy effects format (direct keys)")
+        _effect_legacy(canvas, text, font, centered_x, centered_y, color, effects)
+
+def _effect_plain(canvas, text, font, x, y, color, settings) -> None:
+    """Draw the text with no effect"""
+    ImageDraw.Draw(canvas).text((x, y), text, fill=color, font=font)
+
+def _effect_shadow(canvas, text, font, x, y, color, settings) -> None:
+    """Drop shadow, optionally Gaussian-blurred, under the text"""
+    shadow_offset = settings.get('offset', [5, 5])
+    shadow_color = settings.get('color', '#000000')
+    shadow_opacity = settings.get('opacity', 0.5)
+    shadow_blur = settings.get('blur', 3)
+    
+    # Ensure offset is a tuple/list with at least 2 elements
+    if isinstance(shadow_offset, (list, tuple)) and len(shadow_offset) >= 2:
+        offset_x, offset_y = shadow_offset[0], shadow_offset[1]
+    else:
+        offset_x, offset_y = 5, 5
+    
+    logger.debug(
+        "Applying shadow effect: offset=(%s, %s), color=%s, opacity=%s, blur=%s",
+        offset_x, offset_y, shadow_color, shadow_opacity, shadow_blur
+    )
+    
+    # Convert shadow color to RGBA with opacity
+    shadow_rgba = _hex_to_rgba(shadow_color, shadow_opacity)
+    
+    # Rasterize the glyphs once; the shadow and the text are both fills through this mask
+    mask, (mask_dx, mask_dy) = _render_glyph_mask(text, font)
+    shadow_x = x + offset_x + mask_dx
+    shadow_y = y + offset_y + mask_dy
+    
+    # Draw shadow text, softened on a bbox-sized layer when blur is set
+    if shadow_blur > 0:
+        shadow_layer, pad = _blurred_text_layer(mask, shadow_rgba, shadow_blur)
+        _composite_layer(canvas, shadow_layer, shadow_x - pad, shadow_y - pad)
+    else:
+        _fill_mask(canvas, shadow_rgba, mask, shadow_x, shadow_y)
+    
+    # Draw main text on top
+    _fill_mask(canvas, color, mask, x + mask_dx, y + mask_dy)
+
+def _effect_outline(canvas, text, font, x, y, color, settings) -> None:
+    """Stroked outline around the text"""
+    outline_width = settings.get('width', 2)
+    outline_color = settings.get('color', '#000000')
+    outline_opacity = settings.get('opacity', 1.0)
+    
+    logger.debug(
+        "Applying outline effect: width=%s, color=%s, opacity=%s",
+        outline_width, outline_color, outline_opacity
+    )
+    
+    # Convert outline color to RGBA with opacity
+    outline_rgba = _hex_to_rgba(outline_color, outline_opacity)
+    
+    # Draw the main text with a stroked outline in a single rasterization pass
+    ImageDraw.Draw(canvas).text(
+        (x, y),
+        text,
+        fill=color,
+        font=font,
+        stroke_width=outline_width,
+        stroke_fill=outline_rgba
+    )
+
+def _effect_glow(canvas, text, font, x, y, color, settings) -> None:
+    """Soft colored glow around the text"""
+    glow_color = settings.get('color', '#FFFFFF')
+    glow_radius = settings.get('radius', 10)
+    glow_opacity = settings.get('opacity', 0.7)
+    
+    logger.debug(
+        "Applying glow effect: color=%s, radius=%s, opacity=%s",
+        glow_color, glow_radius, glow_opacity
+    )
+    
+    # Convert glow color to RGBA with opacity
+    glow_rgba = _hex_to_rgba(glow_color, glow_opacity)
+    
+    # Blur a padded copy of the glyph mask once to get the radial falloff,
+    # then tint it with the glow color and composite it under the text
+    mask, (mask_dx, mask_dy) = _render_glyph_mask(text, font)
+    glow_layer, pad = _blurred_text_layer(mask, glow_rgba, glow_radius)
+    _composite_layer(canvas, glow_layer, x + mask_dx - pad, y + mask_dy - pad)
+    
+    # Draw the main text on top
+    _fill_mask(canvas, color, mask, x + mask_dx, y + mask_dy)
+
+def _effect_3d_depth(canvas, text, font, x, y, color, settings) -> None:
+    """Stack of offset copies behind the text, shaded along a color gradient"""
+    layers = settings.get('layers', 10)
+    angle = settings.get('angle', 45)
+    distance = settings.get('distance', 2)
+    color_gradient = settings.get('color_gradient', ['#333333', '#666666', '#999999'])
+    
+    logger.debug(
+        "Applying 3D depth effect: layers=%s, angle=%s, distance=%s",
+        layers, angle, distance
+    )
+    
+    # Convert angle to radians
+    angle_rad = math.radians(angle)
+    
+    # Calculate x and y offsets based on the angle
+    dx = math.cos(angle_rad) * distance
+    dy = math.sin(angle_rad) * distance
+    
+    # Resolve each gradient color once; depth layers repeat them, and a
+    # color string would otherwise be re-parsed on every fill
+    gradient_fills = [ImageColor.getcolor(c, 'RGBA') for c in color_gradient]
+    
+    # Rasterize the glyphs once; every depth layer is a fill through this mask
+    mask, (mask_dx, mask_dy) = _render_glyph_mask(text, font)
+    
+    # Draw layers back to front
+    for i in range(layers, 0, -1):
+        # Map layer index to color index in gradient
+        color_index = min(int((i / layers) * (len(color_gradient) - 1)), len(color_gradient) - 1)
+        
+        layer_x = x - int(i * dx) + mask_dx
+        layer_y = y - int(i * dy) + mask_dy
+        
+        _fill_mask(canvas, gradient_fills[color_index], mask, layer_x, layer_y)
+    
+    # Draw the main text on top
+    _fill_mask(canvas, color, mask, x + mask_dx, y + mask_dy)
+
+def _effect_legacy(canvas, text, font, x, y, color, effects) -> None:
+    """Legacy effects format with direct keys; only a hard shadow is supported"""
+    mask, (mask_dx, mask_dy) = _render_glyph_mask(text, font)
+    
+    # Apply shadow if specified
+    if 'shadow' in effects:
+        shadow_settings = effects['shadow']
+        shadow_offset = shadow_settings.get('offset', (5, 5))
+        shadow_color = shadow_settings.get('color', '#000000')
+        
+        # Draw shadow
+        shadow_x = x + shadow_offset[0] + mask_dx
+        shadow_y = y + shadow_offset[1] + mask_dy
+        
+        _fill_mask(canvas, shadow_color, mask, shadow_x, shadow_y)
+    
+    # Draw the main text
+    _fill_mask(canvas, color, mask, x + mask_dx, y + mask_dy)
+
+# Text effect renderers, keyed by the 'type' field of the effects format
+_EFFECT_DISPATCH = {
+    'shadow': _effect_shadow,
+    'outline': _effect_outline,
+    'glow': _effect_glow,
+    '3d_depth': _effect_3d_depth
+}
+
+def _render_text_sprite(
+    text: str,
+    font: ImageFont.FreeTypeFont,
+    color: str,
+    effects: Optional[Dict[str, Any]]
+) -> Tuple[Image.Image, Tuple[int, int]]:
+    """
+    Render text and its effects onto a transparent layer cropped to the drawn pixels.
+    
+    Returns:
+        The layer and the offset of its top-left corner from the text's anchor
+        position, i.e. where to composite it for a given (x, y)
+    """
+    measure = ImageDraw.Draw(Image.new('L', (1, 1)))
+    left, top, right, bottom = measure.textbbox((0, 0), text, font=font)
+    text_width = right - left
+    text_height = bottom - top
+    margin = _effect_margin(effects)
+    
+    # Pick the anchor so that after _apply_text_effects centers the text, its
+    # bounding box starts exactly `margin` pixels in from the layer edge
+    anchor_x = margin - left + text_width // 2
+    anchor_y = margin - top + text_height // 2 + int(text_height * 0.375)
+    
+    layer = Image.new('RGBA', (text_width + 2 * margin, text_height + 2 * margin), (0, 0, 0, 0))
+    _apply_text_effects(layer, text, (anchor_x, anchor_y), font, color, effects)
+    
+    bbox = layer.getbbox()
+    if bbox is None:
+        return Image.new('RGBA', (1, 1), (0, 0, 0, 0)), (0, 0)
+    return layer.crop(bbox), (bbox[0] - anchor_x, bbox[1] - anchor_y)
+
+@functools.lru_cache(maxsize=128)
+def _render_text_layer(
+    font_file: str,
+    font_size: int,
+    fonts_dir: str,
+    text: str,
+    color: str,
+    effects_key: Any
+) -> Tuple[Image.Image, Tuple[int, int]]:
+    """
+    _render_text_sprite for a font as loaded by _load_font, cached on (font, size,
+    text, color, frozen effects) so a caption reused across backgrounds skips glyph
+    rasterization and every effect pass. Like _load_font it raises for a font that
+    cannot be loaded, so no fallback render is ever cached. The returned layer is
+    shared between callers and must be treated as read-only.
+    """
+    font = _load_font(font_file, font_size, fonts_dir)
+    return _render_text_sprite(text, font, color, _thaw(effects_key))
+
 class CompositionService:
+    # Shared across instances so URL fetches reuse pooled keep-alive connections
+    _session: Optional[aiohttp.ClientSession] = None
+
     def __init__(self):
         self.s3 = S3Service()
         self.fonts_dir = Path("assets/fonts")
@@ -72,14 +750,73 @@ class CompositionService:
             }
         }
 
+        # Presets frozen once into the typed effects format; _effects_key hands
+        # them out as text-layer cache keys without re-freezing per render
+        self._frozen_presets = {
+            name: _freeze({"type": name, "settings": settings})
+            for name, settings in self.effect_presets.items()
+        }
+
         # Ensure the uploads directory exists
         Path("uploads/public").mkdir(parents=True, exist_ok=True)
         Path("uploads/temp").mkdir(parents=True, exist_ok=True)
+        self.processed_dir = Path("uploads/processed")
+        self.processed_dir.mkdir(parents=True, exist_ok=True)
+        self._upload_semaphore = asyncio.Semaphore(UPLOAD_WORKERS)
+        
+        # Compile (or load from cache) the blend kernel now rather than on the first request
+        if _alpha_over is not None:
+            # The background is blended in place; the foreground comes from
+            # np.asarray(PIL image), which is read-only, so warm up that exact signature
+            warm = np.zeros((2, 2, 4), dtype=np.uint8)
+            foreground = np.zeros((2, 2, 4), dtype=np.uint8)
+            foreground.setflags(write=False)
+            _alpha_over(warm, foreground, warm)
         
         # Base directory for the application
         self.base_dir = Path(os.getcwd())
         logger.info(f"CompositionService initialized with base directory: {self.base_dir}")
 
+    @classmethod
+    def _get_session(cls) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use"""
+        if cls._session is None or cls._session.closed:
+            cls._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300)
+            )
+        return cls._session
+
+    @classmethod
+    async def close_session(cls) -> None:
+        """Close the shared HTTP session; called on application shutdown"""
+        if cls._session is not None and not cls._session.closed:
+            await cls._session.close()
+        cls._session = None
+
+    async def _upload_result(self, image: Image.Image, path: Path, output_format: str = "png") -> Dict:
+        """
+        Encode an image in memory on the I/O pool and upload the bytes under path's
+        file name, with its suffix set by output_format. Nothing touches disk unless
+        SAVE_LOCAL_OUTPUTS is set, in which case the same bytes are also written to
+        path for debugging.
+        
+        "png" uses zlib level 1, several times faster than the default level 6 for a
+        ~20% larger file; "webp" is lossless at the fastest method, smaller still.
+        """
+        if output_format == "webp":
+            path = path.with_suffix(".webp")
+            save = functools.partial(image.save, format="WEBP", lossless=True, quality=80, method=0)
+        else:
+            path = path.with_suffix(".png")
+            save = functools.partial(image.save, format="PNG", compress_level=1, optimize=False)
+        loop = asyncio.get_running_loop()
+        buffer = BytesIO()
+        await loop.run_in_executor(_IO_POOL, save, buffer)
+        data = buffer.getvalue()
+        if SAVE_LOCAL_OUTPUTS:
+            await loop.run_in_executor(_IO_POOL, path.write_bytes, data)
+        return await self.s3.upload_bytes(data, path.name, executor=_IO_POOL)
+
     async def _resolve_image_path(self, image_path: str) -> str:
         """
         Resolves various image path formats to an actual file path that can be opened.
@@ -103,14 +840,14 @@ class CompositionService:
                 temp_file.close()
                 
                 # Download the file
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(image_path) as response:
-                        if response.status != 200:
-                            raise Exception(f"Failed to download image: HTTP {response.status}")
-                        
-                        content = await response.read()
-                        async with aiofiles.open(temp_path, 'wb') as f:
-                            await f.write(content)
+                async with self._get_session().get(image_path) as response:
+                    if response.status != 200:
+                        raise Exception(f"Failed to download image: HTTP {response.status}")
+                    
+                    # Stream straight to disk so large images are never held in memory
+                    async with aiofiles.open(temp_path, 'wb') as f:
+                        async for chunk in response.content.iter_chunked(64 * 1024):
+                            await f.write(chunk)
                 
                 logger.info(f"Downloaded image to temporary file: {temp_path}")
                 return temp_path
@@ -157,351 +894,146 @@ class CompositionService:
             logger.error(f"File not found: {image_path} or {full_path}")
             raise FileNotFoundError(f"File not found: {image_path}")
 
-    async def _get_image_from_url(self, url: str) -> Image.Image:
-        """Fetches an image from a URL with improved error handling"""
+    async def _get_image_array_from_url(self, url: str) -> np.ndarray:
+        """Fetches an image from a URL as an RGBA array with improved error handling"""
         try:
             # Set a timeout for the request to prevent hanging
-            response = requests.get(url, timeout=60)
-            response.raise_for_status()  # Raise an exception for 4xx/5xx responses
-            return Image.open(BytesIO(response.content)).convert('RGBA')
-        except requests.exceptions.RequestException as e:
+            timeout = aiohttp.ClientTimeout(total=60)
+            async with self._get_session().get(url, timeout=timeout) as response:
+                response.raise_for_status()  # Raise an exception for 4xx/5xx responses
+                content = await response.read()
+            return _decode_rgba(content)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logging.error(f"Error fetching image from URL {url}: {str(e)}")
             raise ValueError(f"Failed to fetch image from URL: {str(e)}")
         except Exception as e:
             logging.error(f"Error processing image from URL {url}: {str(e)}")
             raise ValueError(f"Failed to process image: {str(e)}")
-        
-    def _get_font(self, font_name: str, font_size: int) -> ImageFont.FreeTypeFont:
-        """Try to load the specified font or fall back to a suitable alternative"""
+
+    def _font_file(self, font_name: str, font_size: int) -> Optional[str]:
+        """
+        Resolve a font name to the file _load_font loads, or None (logged) if it
+        cannot be loaded at font_size, in which case callers use _fallback_font
+        """
         try:
-            # Check if font is in our map of known fonts
-            if font_name.lower() in self.dramatic_fonts:
-                font_file = self.dramatic_fonts[font_name.lower()]
-                
-                # If it's a local file name, try to load it from our fonts directory
-                if font_file.endswith('.ttf') or font_file.endswith('.otf'):
-                    font_path = self.fonts_dir / font_file
-                    if font_path.exists():
-                        return ImageFont.truetype(str(font_path), font_size)
-                
-                # Otherwise assume it's a system font
-                return ImageFont.truetype(font_file, font_size)
-            
-            # Direct font name as fallback
-            return ImageFont.truetype(font_name, font_size)
+            font_file = self.dramatic_fonts.get(font_name.lower(), font_name)
+            _load_font(font_file, font_size, str(self.fonts_dir))
+            return font_file
         except Exception as e:
             logging.warning(f"Failed to load font {font_name}: {e}")
-            # Fallback to default font
-            try:
-                return ImageFont.truetype("Arial", font_size)
-            except:
-                return ImageFont.load_default()
+            return None
 
-    def _apply_text_effects(
-        self, 
-        draw: ImageDraw.ImageDraw,
+    def _get_font(self, font_name: str, font_size: int) -> ImageFont.FreeTypeFont:
+        """Try to load the specified font or fall back to a suitable alternative"""
+        font_file = self._font_file(font_name, font_size)
+        if font_file is None:
+            return _fallback_font(font_size, str(self.fonts_dir))
+        return _load_font(font_file, font_size, str(self.fonts_dir))
+
+    def _measure_text(self, text: str, font_name: str, font_size: int) -> Tuple[int, int]:
+        """Cached (width, height) of text in the font _get_font would return"""
+        font_file = self._font_file(font_name, font_size)
+        if font_file is None:
+            return _text_size(_fallback_font(font_size, str(self.fonts_dir)), text)
+        return _measure_text(font_file, font_size, str(self.fonts_dir), text)
+
+    def _effects_key(self, effects: Optional[Dict[str, Any]]) -> Any:
+        """
+        Frozen text-layer cache key for an effects dict. An effect named by type
+        alone renders with its defaults, which are the preset's settings, so it
+        reuses the pre-frozen preset key (and shares its cached layers).
+        """
+        if effects and set(effects) <= {'type', 'settings'} and not effects.get('settings'):
+            preset_key = self._frozen_presets.get(effects['type'])
+            if preset_key is not None:
+                return preset_key
+        return _freeze(effects)
+
+    def _render_text_layer(
+        self,
         text: str,
-        position: Tuple[int, int],
-        font: ImageFont.FreeTypeFont,
-        color: str = "#FFFFFF",
-        effects: Dict[str, Any] = None
-    ) -> None:
+        font_name: str,
+        font_size: int,
+        color: str,
+        effects_key: Any
+    ) -> Tuple[Image.Image, Tuple[int, int]]:
         """
-        Apply text with visual effects to the image.
-        
-        Args:
-            draw: ImageDraw object
-            text: Text to draw
-            position: (x, y) position
-            font: Font to use
-            color: Text color in hex format
-            effects: Dictionary with text effects settings
+        The cached module-level _render_text_layer for a font name. A font that
+        cannot be loaded renders uncached with the fallback font.
         """
-        # Log all input parameters for debugging
-        logger.info(f"_apply_text_effects: text='{text}', position={position}, font={font}, color={color}")
-        logger.info(f"Effects: {effects}")
-        
-        # Get bounding box of the text to properly center it
-        left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
-        text_width = right - left
-        text_height = bottom - top
-        
-        logger.debug(f"Text bounding box: width={text_width}, height={text_height}")
-        
-        # Convert position tuple to x, y coordinates
-        if isinstance(position, tuple) and len(position) == 2:
-            x, y = position
-        else:
-            # Handle dictionary positions (from frontend)
-            if isinstance(position, dict) and 'x' in position and 'y' in position:
-                x = position['x']
-                y = position['y']
-            else:
-                logger.warning(f"Invalid position format: {position}, using (0, 0)")
-                x, y = 0, 0
-                
-        logger.debug(f"Original position: x={x}, y={y}")
-                
-        # Apply the ORIGINAL positioning logic that worked correctly
-        # 1. Center horizontally
-        centered_x = x - text_width // 2
-        
-        # 2. Apply the vertical adjustment factor that matches CSS rendering
-        # This factor (0.375 or 37.5%) was calibrated to match frontend preview
-        vertical_adjustment_factor = 0.375
-        vertical_adjustment = int(text_height * vertical_adjustment_factor)
-        
-        # 3. Center vertically and apply the adjustment
-        centered_y = y - text_height // 2 - vertical_adjustment
-        
-        logger.debug(f"Adjusted position: x={centered_x}, y={centered_y} (with {vertical_adjustment}px vertical adjustment)")
-        
-        # If no effects specified or effects is None, just draw the text
-        if not effects:
-            logger.debug("No effects specified, drawing plain text")
-            draw.text((centered_x, centered_y), text, fill=color, font=font)
-            return
-            
-        # Check if it's the legacy format (direct keys) or new format (type + settings)
-        if 'type' in effects:
-            # Process the new unified effects format
-            effect_type = effects.get('type')
-            settings = effects.get('settings', {})
-            
-            logger.debug(f"Using new effects format: type={effect_type}")
-            
-            if effect_type == 'shadow':
-                # Shadow effect
-                shadow_offset = settings.get('offset', [5, 5])
-                shadow_color = settings.get('color', '#000000')
-                shadow_opacity = settings.get('opacity', 0.5)
-                shadow_blur = settings.get('blur', 3)
-                
-                # Ensure offset is a tuple/list with at least 2 elements
-                if isinstance(shadow_offset, (list, tuple)) and len(shadow_offset) >= 2:
-                    offset_x, offset_y = shadow_offset[0], shadow_offset[1]
-                else:
-                    offset_x, offset_y = 5, 5
-                
-                logger.debug(f"Applying shadow effect: offset=({offset_x}, {offset_y}), color={shadow_color}, opacity={shadow_opacity}, blur={shadow_blur}")
-                
-                # Convert shadow color to RGBA with opacity
-                shadow_rgba = self._hex_to_rgba(shadow_color)
-                shadow_rgba = (shadow_rgba[0], shadow_rgba[1], shadow_rgba[2], int(255 * shadow_opacity))
-                
-                # Apply shadow
-                shadow_x = centered_x + offset_x
-                shadow_y = centered_y + offset_y
-                
-                # Draw shadow text
-                draw.text((shadow_x, shadow_y), text, fill=shadow_rgba, font=font)
-                
-                # Draw main text on top
-                draw.text((centered_x, centered_y), text, fill=color, font=font)
-                
-            elif effect_type == 'outline':
-                # Outline effect
-                outline_width = settings.get('width', 2)
-                outline_color = settings.get('color', '#000000')
-                outline_opacity = settings.get('opacity', 1.0)
-                
-                logger.debug(f"Applying outline effect: width={outline_width}, color={outline_color}, opacity={outline_opacity}")
-                
-                # Convert outline color to RGBA with opacity
-                outline_rgba = self._hex_to_rgba(outline_color)
-                outline_rgba = (outline_rgba[0], outline_rgba[1], outline_rgba[2], int(255 * outline_opacity))
-                
-                # Draw text multiple times around the target position for outline
-                for offset_x in range(-outline_width, outline_width + 1):
-                    for offset_y in range(-outline_width, outline_width + 1):
-                        # Skip the center pixel
-                        if offset_x == 0 and offset_y == 0:
-                            continue
-                            
-                        # Draw the outline text
-                        draw.text(
-                            (centered_x + offset_x, centered_y + offset_y),
-                                    text, 
-                            fill=outline_rgba,
-                                    font=font
-                                )
-                
-                # Draw the main text on top
-                draw.text((centered_x, centered_y), text, fill=color, font=font)
-                
-            elif effect_type == 'glow':
-                # Glow effect
-                glow_color = settings.get('color', '#FFFFFF')
-                glow_radius = settings.get('radius', 10)
-                glow_opacity = settings.get('opacity', 0.7)
-                
-                logger.debug(f"Applying glow effect: color={glow_color}, radius={glow_radius}, opacity={glow_opacity}")
-                
-                # Convert glow color to RGBA with opacity
-                glow_rgba = self._hex_to_rgba(glow_color)
-                glow_rgba = (glow_rgba[0], glow_rgba[1], glow_rgba[2], int(255 * glow_opacity))
-                
-                # Create a series of increasingly transparent outlines
-                steps = min(glow_radius, 20)  # Limit to 20 steps for performance
-                
-                for i in range(1, steps + 1):
-                    current_radius = (i / steps) * glow_radius
-                    current_opacity = glow_opacity * (1 - (i / steps))
-                    
-                    current_rgba = (glow_rgba[0], glow_rgba[1], glow_rgba[2], int(255 * current_opacity))
-                    
-                    # Draw text at various offsets to create the glow
-                    for angle in range(0, 360, 30):  # 12 points around the circle
-                        offset_x = int(current_radius * math.cos(math.radians(angle)))
-                        offset_y = int(current_radius * math.sin(math.radians(angle)))
-                        
-                        draw.text(
-                            (centered_x + offset_x, centered_y + offset_y),
-                            text,
-                            fill=current_rgba,
-                            font=font
-                        )
-                
-                # Draw the main text on top
-                draw.text((centered_x, centered_y), text, fill=color, font=font)
-                
-            elif effect_type == '3d_depth':
-                # 3D depth effect
-                layers = settings.get('layers', 10)
-                angle = settings.get('angle', 45)
-                distance = settings.get('distance', 2)
-                color_gradient = settings.get('color_gradient', ['#333333', '#666666', '#999999'])
-                
-                logger.debug(f"Applying 3D depth effect: layers={layers}, angle={angle}, distance={distance}")
-                
-                # Convert angle to radians
-                angle_rad = math.radians(angle)
-                
-                # Calculate x and y offsets based on the angle
-                dx = math.cos(angle_rad) * distance
-                dy = math.sin(angle_rad) * distance
-                
-                # Draw layers back to front
-                for i in range(layers, 0, -1):
-                    # Map layer index to color index in gradient
-                    color_index = min(int((i / layers) * (len(color_gradient) - 1)), len(color_gradient) - 1)
-                    layer_color = color_gradient[color_index]
-                    
-                    layer_x = centered_x - int(i * dx)
-                    layer_y = centered_y - int(i * dy)
-                    
-                    draw.text((layer_x, layer_y), text, fill=layer_color, font=font)
-                
-                # Draw the main text on top
-                draw.text((centered_x, centered_y), text, fill=color, font=font)
-                
-            else:
-                # Unknown effect type, just draw plain text
-                logger.warning(f"Unknown effect type: {effect_type}, drawing plain text")
-                draw.text((centered_x, centered_y), text, fill=color, font=font)
-        
-        else:
-            # Legacy format (for backward compatibility)
-            logger.debug("Using legacy effects format (direct keys)")
-            
-            # Apply shadow if specified
-            if 'shadow' in effects:
-                shadow_settings = effects['shadow']
-                shadow_offset = shadow_settings.get('offset', (5, 5))
-                shadow_color = shadow_settings.get('color', '#000000')
-                
-                # Draw shadow
-                shadow_x = centered_x + shadow_offset[0]
-                shadow_y = centered_y + shadow_offset[1]
-                
-                draw.text((shadow_x, shadow_y), text, fill=shadow_color, font=font)
-            
-            # Draw the main text
-            draw.text((centered_x, centered_y), text, fill=color, font=font)
-
-    def _hex_to_rgba(self, hex_color: str) -> Tuple[int, int, int, int]:
-        """Convert hex color to RGBA tuple"""
-        # Handle colors with alpha in hex format (#RRGGBBAA)
-        if hex_color.startswith('#'):
-            hex_color = hex_color.lstrip('#')
-            
-            # Handle different hex formats
-            if len(hex_color) == 8:  # #RRGGBBAA
-                r = int(hex_color[0:2], 16)
-                g = int(hex_color[2:4], 16)
-                b = int(hex_color[4:6], 16)
-                a = int(hex_color[6:8], 16)
-            elif len(hex_color) == 6:  # #RRGGBB
-                r = int(hex_color[0:2], 16)
-                g = int(hex_color[2:4], 16)
-                b = int(hex_color[4:6], 16)
-                a = 255
-            elif len(hex_color) == 4:  # #RGBA
-                r = int(hex_color[0], 16) * 17
-                g = int(hex_color[1], 16) * 17
-                b = int(hex_color[2], 16) * 17
-                a = int(hex_color[3], 16) * 17
-            elif len(hex_color) == 3:  # #RGB
-                r = int(hex_color[0], 16) * 17
-                g = int(hex_color[1], 16) * 17
-                b = int(hex_color[2], 16) * 17
-                a = 255
-            else:
-                # Default to white fully opaque if invalid format
-                r, g, b, a = 255, 255, 255, 255
-        else:
-            # Default to white fully opaque if not hex format
-            r, g, b, a = 255, 255, 255, 255
-            
-        return (r, g, b, a)
-    
+        font_file = self._font_file(font_name, font_size)
+        if font_file is None:
+            font = _fallback_font(font_size, str(self.fonts_dir))
+            return _render_text_sprite(text, font, color, _thaw(effects_key))
+        return _render_text_layer(font_file, font_size, str(self.fonts_dir), text, color, effects_key)
+
     def _suggest_text_positions(
         self, 
-        background: Image.Image, 
+        background: Union[Image.Image, np.ndarray], 
         text: str,
         font: ImageFont.FreeTypeFont,
-        text_size: Tuple[int, int]
+        text_size: Tuple[int, int],
+        bg_stats: Optional[np.ndarray] = None,
+        stats_block: int = 1
     ) -> List[Dict[str, int]]:
-        """Suggest optimal text positions based on background content"""
-        width, height = background.size
+        """
+        Suggest optimal text positions based on background content
         
-        # Convert to numpy array for analysis
-        bg_array = np.array(background)
+        bg_stats is an optional _block_means map of the background at stats_block
+        resolution; without it, regions are scored at full resolution.
+        """
+        # Convert to numpy array for analysis (no copy when already an array)
+        bg_array = np.asarray(background)
+        height, width = bg_array.shape[:2]
         
         # Check if alpha channel exists
         has_alpha = bg_array.shape[2] == 4
         
-        # Create grid of potential positions
+        # Summed-area table of the scored channel(s), padded with a leading zero row
+        # and column so any window sum is four lookups instead of a fresh np.mean
+        if bg_stats is not None:
+            plane = bg_stats
+            channels = 1
+        elif has_alpha:
+            plane = bg_array[:, :, 3].astype(np.int64)
+            channels = 1
+            stats_block = 1
+        else:
+            plane = bg_array.sum(axis=2, dtype=np.int64)
+            channels = bg_array.shape[2]
+            stats_block = 1
+        sat = np.zeros((plane.shape[0] + 1, plane.shape[1] + 1), dtype=plane.dtype)
+        sat[1:, 1:] = plane.cumsum(axis=0).cumsum(axis=1)
+        
+        # Create grid of potential positions, row by row, kept within bounds
         grid_size = 3  # 3x3 grid
-        positions = []
+        cells = np.arange(grid_size) + 0.5
+        xs = (width * cells / grid_size - text_size[0] / 2).astype(np.int64)
+        ys = (height * cells / grid_size - text_size[1] / 2).astype(np.int64)
+        xs = np.maximum(10, np.minimum(width - text_size[0] - 10, xs))
+        ys = np.maximum(10, np.minimum(height - text_size[1] - 10, ys))
+        x_pos, y_pos = (grid.ravel() for grid in np.meshgrid(xs, ys))
         
-        for y_idx in range(grid_size):
-            for x_idx in range(grid_size):
-                # Calculate position in grid
-                x_pos = int(width * (x_idx + 0.5) / grid_size - text_size[0] / 2)
-                y_pos = int(height * (y_idx + 0.5) / grid_size - text_size[1] / 2)
-                
-                # Keep within bounds
-                x_pos = max(10, min(width - text_size[0] - 10, x_pos))
-                y_pos = max(10, min(height - text_size[1] - 10, y_pos))
-                
-                # Check if this position is good (transparent or empty area)
-                region = bg_array[
-                    y_pos:min(y_pos + text_size[1], height), 
-                    x_pos:min(x_pos + text_size[0], width)
-                ]
-                
-                if has_alpha:
-                    # Calculate average alpha (transparency)
-                    avg_alpha = np.mean(region[:, :, 3]) if region.size > 0 else 0
-                    
-                    # If area is transparent (low alpha), it's a good candidate
-                    if avg_alpha < 128:  # Less than 50% opaque
-                        positions.append({"x": x_pos, "y": y_pos, "score": 255 - avg_alpha})
-                else:
-                    # For images without alpha, check brightness (darker areas might be better for light text)
-                    avg_brightness = np.mean(region) if region.size > 0 else 0
-                    positions.append({"x": x_pos, "y": y_pos, "score": 255 - avg_brightness})
+        # Score every candidate region in one vectorized pass over the table; boxes
+        # are widened to whole blocks and clipped to the table, so off-image
+        # candidates get an empty area
+        rows, cols = plane.shape
+        x0 = np.minimum(x_pos // stats_block, cols)
+        y0 = np.minimum(y_pos // stats_block, rows)
+        x1 = np.maximum(np.minimum(-(-(x_pos + text_size[0]) // stats_block), cols), x0)
+        y1 = np.maximum(np.minimum(-(-(y_pos + text_size[1]) // stats_block), rows), y0)
+        region_means = _score_regions(sat, np.stack([x0, y0, x1, y1], axis=1), channels)
+        
+        positions = []
+        for x, y, region_mean in zip(x_pos.tolist(), y_pos.tolist(), region_means.tolist()):
+            if has_alpha:
+                # Average alpha (transparency): only transparent-ish areas (less
+                # than 50% opaque) are good candidates
+                if region_mean < 128:
+                    positions.append({"x": x, "y": y, "score": 255 - region_mean})
+            else:
+                # For images without alpha, check brightness (darker areas might be better for light text)
+                positions.append({"x": x, "y": y, "score": 255 - region_mean})
         
         # Sort by score (higher is better)
         positions.sort(key=lambda p: p["score"], reverse=True)
@@ -517,7 +1049,9 @@ class CompositionService:
         font_size: int = 120,  # Increased default font size for dramatic effect
         color: str = "#FFFFFF",  # Changed default to white for better visibility
         font_name: str = "Impact",  # Changed default font for dramatic effect
-        effects: Dict[str, Any] = None  # New parameter for text effects
+        effects: Dict[str, Any] = None,  # New parameter for text effects
+        output_format: str = "png",
+        skip_upload: bool = False
     ) -> Tuple[str, dict]:
         """
         Add text to an image at a specific position
@@ -530,6 +1064,9 @@ class CompositionService:
             color: Text color in hex format
             font_name: Font name
             effects: Dictionary with text effects settings
+            output_format: "png" (fast, lightly compressed) or "webp"
+            skip_upload: Only save locally, leaving cloud_url None, so the caller
+                can batch the upload
             
         Returns:
             Path to the image with text added
@@ -548,17 +1085,8 @@ class CompositionService:
             # Log image dimensions to help diagnose positioning issues
             logging.info(f"Original background dimensions: {background.size}")
                 
-            # Create a drawing canvas
-            canvas = background.copy()
-            draw = ImageDraw.Draw(canvas)
-                
-            # Get the font
-            font = self._get_font(font_name, font_size)
-                
-                # Calculate text size for info purposes
-            text_bbox = draw.textbbox((0, 0), text, font=font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
+            # Calculate text size for info purposes
+            text_width, text_height = self._measure_text(text, font_name, font_size)
             
             # Extract position coordinates and ensure they're integers
             pos_x = int(position.get('x', 10))
@@ -568,34 +1096,40 @@ class CompositionService:
             logging.info(f"Rendering text at position: x={pos_x}, y={pos_y}, font_size={font_size}")
             logging.info(f"Text dimensions: width={text_width}, height={text_height}")
             
-                # Apply text with effects using position coordinates
-                # Note: position adjustment is handled inside _apply_text_effects
-            self._apply_text_effects(
-                draw, 
-                text, 
-                    (pos_x, pos_y), 
-                font, 
-                color, 
-                effects
+            # Render (or fetch the cached) text layer and composite it at the anchor;
+            # position adjustment is baked into the layer's offset. The freshly decoded
+            # background is ours to modify, so the layer goes straight into it rather
+            # than into a full-size copy
+            layer, (offset_x, offset_y) = self._render_text_layer(
+                text,
+                font_name,
+                font_size,
+                color,
+                self._effects_key(effects)
             )
-            
-            # Save the result
-            processed_dir = Path("uploads/processed")
-            processed_dir.mkdir(exist_ok=True)
+            _composite_layer(background, layer, pos_x + offset_x, pos_y + offset_y)
             
             # Generate a unique filename based on the original path
             base_name = os.path.basename(background_path)
             base_name_without_ext = os.path.splitext(base_name)[0]
-            text_path = processed_dir / f"{base_name_without_ext}_text_{int(time.time())}.png"
+            extension = "webp" if output_format == "webp" else "png"
+            text_path = self.processed_dir / f"{base_name_without_ext}_text_{_PROCESS_TAG}-{next(_name_counter)}.{extension}"
             
-            # Save locally
-            canvas.save(text_path, "PNG")
+            # Save locally; zlib level 1 is several times faster than the default
+            # level 6 for a ~20% larger intermediate file
+            if extension == "webp":
+                background.save(text_path, "WEBP", quality=90, method=4)
+            else:
+                background.save(text_path, "PNG", compress_level=1, optimize=False)
             
             # Log the path of the saved image
             logging.info(f"Saved text image to: {text_path}")
             
             # Upload to cloud storage
-            cloud_url = await self.s3.upload_image(str(text_path))
+            cloud_url = None
+            if not skip_upload:
+                async with self._upload_semaphore:
+                    cloud_url = await self.s3.upload_image(str(text_path), executor=_IO_POOL)
             
             # Store the original (non-adjusted) position in the return info
             # This ensures the frontend gets back the same position it sent
@@ -684,7 +1218,9 @@ class CompositionService:
         background_with_text_path: str,
         foreground_path: str,
         blend_mode: str = 'normal',  # Added parameter for blend mode
-        blend_opacity: float = 1.0  # Added parameter for opacity
+        blend_opacity: float = 1.0,  # Added parameter for opacity
+        resample_filter: Optional[str] = None,
+        output_format: str = "png"
     ) -> str:
         """
         Compose the final image by overlaying the foreground on top of the background with text
@@ -694,6 +1230,9 @@ class CompositionService:
             foreground_path: Path to the foreground image
             blend_mode: Blend mode for composition
             blend_opacity: Opacity for the blend
+            resample_filter: "lanczos", "bicubic" or "bilinear" for resizing the
+                foreground; None picks automatically from the scale factor
+            output_format: "png" (fast, lightly compressed) or "webp" (lossless)
             
         Returns:
             Path to the final composed image
@@ -704,23 +1243,32 @@ class CompositionService:
             foreground_resolved = await self._resolve_image_path(foreground_path)
             
             # Load the images
-            background = Image.open(background_resolved).convert('RGBA')
-            foreground = Image.open(foreground_resolved).convert('RGBA')
+            background_array = _load_rgba(background_resolved)
+            background = Image.fromarray(background_array, 'RGBA')
+            foreground = Image.fromarray(_load_rgba(foreground_resolved, background.size), 'RGBA')
             
             # Resize foreground to match background if needed
             if foreground.size != background.size:
-                foreground = foreground.resize(background.size, Image.Resampling.LANCZOS)
+                resample = _pick_resample(resample_filter, foreground.size, background.size)
+                foreground = foreground.resize(background.size, resample)
             
-            # Create a composite
-            result = Image.alpha_composite(background, foreground)
+            # Create a composite. Subjects usually sit in large transparent borders,
+            # so when the foreground's visible area is small only that region is
+            # blended, in place, into the freshly decoded background
+            bbox = foreground.getbbox()
+            if bbox is None:
+                result = background
+            elif (bbox[2] - bbox[0]) * (bbox[3] - bbox[1]) < 0.7 * background.width * background.height:
+                background.alpha_composite(foreground.crop(bbox), dest=bbox[:2])
+                result = background
+            else:
+                result = _composite_over(background_array, foreground)
             
             # Create a unique filename for the result
-            timestamp = int(time.time())
-            result_path = Path(f"uploads/public/composed_{timestamp}.png")
-            result.save(result_path)
+            result_path = Path(f"uploads/public/composed_{uuid.uuid4().hex}.png")
             
-            # Upload to S3 and get public URL
-            result_info = await self.s3.upload_image(result_path)
+            # Encode and upload to S3 and get public URL
+            result_info = await self._upload_result(result, result_path, output_format)
             
             return result_info['url']
         except Exception as e:
@@ -737,21 +1285,24 @@ class CompositionService:
         """Generate previews of different font sizes for the user to choose from"""
         # Define range of font sizes to preview
         sizes = [80, 100, 120, 150, 180, 220]
-        previews = {}
         
-        # Generate preview for each size
-        for size in sizes:
-            # Add text with the specified size
-            _, info = await self.add_text(
+        # Render all previews concurrently, then upload them as one batch over
+        # the shared S3 connection pool
+        results = await asyncio.gather(*[
+            self.add_text(
                 background_path,
                 text,
                 position,
                 font_size=size,
-                font_name=font_name
+                font_name=font_name,
+                skip_upload=True
             )
-            
-            # Store cloud URL
-            previews[str(size)] = info['cloud_url']
+            for size in sizes
+        ])
+        uploads = await self.s3.upload_many([path for path, _ in results], executor=_IO_POOL)
+        
+        # Store cloud URLs
+        previews = {str(size): cloud_url for size, cloud_url in zip(sizes, uploads)}
         
         return sizes, previews
 
@@ -765,72 +1316,71 @@ class CompositionService:
         """Suggest optimal text positions based on background content"""
         # Load the background image
         if background_path.startswith('http'):
-            background = await self._get_image_from_url(background_path)
+            # Scoring works on the raw pixels, so keep the decoded array as-is
+            background = await self._get_image_array_from_url(background_path)
         else:
-            background = Image.open(background_path).convert('RGBA')
+            background = _load_rgba(background_path)
         
-        # Get the font and calculate text size
-        font = self._get_font(font_name, font_size)
+        # Large backgrounds are scored on 16x16 block averages rather than every pixel
+        height, width = background.shape[:2]
+        if min(height, width) >= 16 * _STATS_BLOCK:
+            stats_block = _STATS_BLOCK
+            bg_stats = _block_means(background, stats_block)
+        else:
+            stats_block = 1
+            bg_stats = None
         
-        # Create a temp drawing context to measure text
-        temp_img = Image.new('RGBA', (1, 1))
-        draw = ImageDraw.Draw(temp_img)
-        text_bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = text_bbox[2] - text_bbox[0]
-        text_height = text_bbox[3] - text_bbox[1]
+        # Get the font and calculate text size (cached per text, font and size)
+        font = self._get_font(font_name, font_size)
+        text_width, text_height = self._measure_text(text, font_name, font_size)
         
         # Get position suggestions
         return self._suggest_text_positions(
             background, 
             text, 
             font, 
-            (text_width, text_height)
+            (text_width, text_height),
+            bg_stats=bg_stats,
+            stats_block=stats_block
         )
 
     def _get_social_media_dimensions(self, template_name: str) -> Tuple[int, int]:
         """Get dimensions for a social media template"""
-        templates = {
-            "instagram_post": (1080, 1080),
-            "instagram_story": (1080, 1920),
-            "facebook_post": (1200, 630),
-            "twitter_post": (1600, 900),
-            "linkedin_post": (1200, 627),
-            "youtube_thumbnail": (1280, 720),
-            "tiktok_video": (1080, 1920)
-        }
-        
-        return templates.get(template_name, (1080, 1080))  # Default to square
+        return _TEMPLATE_DIMS.get(template_name, (1080, 1080))  # Default to square
 
     async def create_template(
         self,
         foreground_path: str,
         background_color: str = "#000000",
         template_name: str = "instagram_post",
-        padding_percent: int = 10
+        padding_percent: int = 10,
+        resample_filter: Optional[str] = None,
+        output_format: str = "png"
     ) -> str:
-        """Create a social media template with the foreground subject"""
-        # Load foreground image
+        """
+        Create a social media template with the foreground subject
+        
+        resample_filter is "lanczos", "bicubic" or "bilinear" to resize with PIL;
+        None shrinks with OpenCV's INTER_AREA and enlarges with LANCZOS.
+        output_format is "png" (fast, lightly compressed) or "webp" (lossless).
+        """
+        # Load foreground image; for local files only the header is read here so
+        # JPEGs can be decoded straight at the template scale below
         if foreground_path.startswith('http'):
-            foreground = await self._get_image_from_url(foreground_path)
+            foreground = await self._get_image_array_from_url(foreground_path)
+            fg_height, fg_width = foreground.shape[:2]
         else:
-            foreground = Image.open(foreground_path).convert('RGBA')
+            foreground = None
+            with Image.open(foreground_path) as header:
+                fg_width, fg_height = header.size
         
-        # Get template dimensions
-        width, height = self._get_social_media_dimensions(template_name)
-        
-        # Create background with specified color
-        background = Image.new('RGBA', (width, height), background_color)
+        # Get template dimensions and the available space after padding
+        width, height, padding_px, avail_width, avail_height = _template_layout(template_name, padding_percent)
         
         # Calculate scaling to fit foreground within template
         # while maintaining aspect ratio and adding padding
-        fg_width, fg_height = foreground.size
         fg_aspect = fg_width / fg_height
         
-        # Calculate available space after padding
-        padding_px = min(width, height) * padding_percent // 100
-        avail_width = width - (2 * padding_px)
-        avail_height = height - (2 * padding_px)
-        
         # Scale foreground to fit available space
         if avail_width / avail_height > fg_aspect:
             # Constrained by height
@@ -841,33 +1391,53 @@ class CompositionService:
             new_width = avail_width
             new_height = int(new_width / fg_aspect)
         
-        # Resize foreground
-        foreground_resized = foreground.resize((new_width, new_height), Image.LANCZOS)
+        # Decode (at reduced scale for JPEGs) and resize foreground
+        if foreground is None:
+            foreground = _load_rgba(foreground_path, (new_width, new_height))
+        if resample_filter is None:
+            foreground_resized = _resize_rgba(foreground, (new_width, new_height))
+        else:
+            foreground = Image.fromarray(foreground, 'RGBA')
+            resample = _pick_resample(resample_filter, foreground.size, (new_width, new_height))
+            foreground_resized = foreground.resize((new_width, new_height), resample)
         
         # Calculate position to center in template
         pos_x = (width - new_width) // 2
         pos_y = (height - new_height) // 2
         
-        # Paste foreground onto background
-        background.paste(foreground_resized, (pos_x, pos_y), foreground_resized)
+        # An opaque foreground filling the whole template is the result as-is;
+        # otherwise paste it onto a background of the specified color
+        if (new_width, new_height) == (width, height) and foreground_resized.getextrema()[3] == (255, 255):
+            background = foreground_resized
+        else:
+            # An opaque color needs no alpha plane; PIL pastes RGBA onto RGB directly
+            # through the foreground's alpha, and the output encodes as RGB
+            fill = ImageColor.getcolor(background_color, 'RGBA')
+            background = Image.new('RGB' if fill[3] == 255 else 'RGBA', (width, height), fill)
+            background.paste(foreground_resized, (pos_x, pos_y), foreground_resized)
         
         # Save result
         processed_dir = Path("uploads/processed")
-        template_path = processed_dir / f"template_{template_name}_{int(time.time())}.png"
-        background.save(template_path, "PNG")
+        template_path = processed_dir / f"template_{template_name}_{uuid.uuid4().hex}.png"
         
-        # Upload to cloud storage
-        cloud_url = await self.s3.upload_image(str(template_path))
+        # Encode and upload to cloud storage
+        cloud_url = await self._upload_result(background, template_path, output_format)
         
         return cloud_url
 
-    async def add_multiple_text_layers(self, background_path: str, text_layers: List['TextLayer']) -> str:
+    async def add_multiple_text_layers(
+        self,
+        background_path: str,
+        text_layers: List['TextLayer'],
+        output_format: str = "png"
+    ) -> str:
         """
         Add multiple text layers to a background image
         
         Args:
             background_path: Path to the background image
             text_layers: List of TextLayer objects
+            output_format: "png" (fast, lightly compressed) or "webp" (lossless)
             
         Returns:
             Path to the image with all text layers added
@@ -877,44 +1447,51 @@ class CompositionService:
             resolved_path = await self._resolve_image_path(background_path)
             
             # Open the background image
-            background = Image.open(resolved_path).convert('RGBA')
+            background = Image.fromarray(_load_rgba(resolved_path), 'RGBA')
             logger.info(f"Loaded background image: {resolved_path}, size: {background.size}")
             
-            # Create a draw object
-            draw = ImageDraw.Draw(background)
+            # Extract style properties with defaults once per distinct style, since
+            # layers commonly share one
+            styles = {}
+            layer_styles = []
+            for layer in text_layers:
+                style_key = _freeze(layer.style)
+                if style_key not in styles:
+                    styles[style_key] = (
+                        layer.style.get('font_name', 'anton'),
+                        layer.style.get('font_size', 120),
+                        layer.style.get('color', '#FFFFFF'),
+                        self._effects_key(layer.style.get('effects', None))
+                    )
+                layer_styles.append(styles[style_key])
+            
+            # Render each text onto its own tight layer, visiting layers grouped by
+            # (font, size) so FreeType keeps working on one face at a time
+            rendered = [None] * len(text_layers)
+            for i in sorted(range(len(text_layers)), key=lambda i: layer_styles[i][:2]):
+                font_name, font_size, color, effects_key = layer_styles[i]
+                rendered[i] = self._render_text_layer(text_layers[i].text, font_name, font_size, color, effects_key)
             
-            # Process each text layer
+            # Composite in the original order so overlapping layers keep their stacking;
+            # position adjustment is baked into each layer's offset
             for i, layer in enumerate(text_layers):
-                text = layer.text
-                
                 # Get position as a tuple directly from the layer
                 pos_x = int(layer.position.get('x', 10))
                 pos_y = int(layer.position.get('y', 10))
                 position = (pos_x, pos_y)
-                
-                # Extract style properties with defaults
-                font_size = layer.style.get('font_size', 120)
-                color = layer.style.get('color', '#FFFFFF')
-                font_name = layer.style.get('font_name', 'anton')
-                effects = layer.style.get('effects', None)
+                font_name, font_size = layer_styles[i][:2]
                 
                 # Log text layer details
-                logger.info(f"Processing text layer {i+1}: text='{text}', position={position}, font={font_name}, size={font_size}")
-                
-                # Get the font
-                font = self._get_font(font_name, font_size)
+                logger.info(f"Processing text layer {i+1}: text='{layer.text}', position={position}, font={font_name}, size={font_size}")
                 
-                # Apply text effects - position adjustment happens inside this method
-                self._apply_text_effects(draw, text, position, font, color, effects)
+                text_layer, (offset_x, offset_y) = rendered[i]
+                _composite_layer(background, text_layer, pos_x + offset_x, pos_y + offset_y)
             
             # Save the result
-            timestamp = int(time.time())
-            result_path = Path(f"uploads/public/multilayer_{timestamp}.png")
-            background.save(result_path)
-            logger.info(f"Saved multilayer image to: {result_path}")
+            result_path = Path(f"uploads/public/multilayer_{uuid.uuid4().hex}.png")
             
-            # Upload to S3 and get public URL
-            result_info = await self.s3.upload_image(result_path)
+            # Encode and upload to S3 and get public URL
+            result_info = await self._upload_result(background, result_path, output_format)
             logger.info(f"Uploaded multilayer image to S3: {result_info['url']}")
             
             return result_info['url']
@@ -922,11 +1499,12 @@ class CompositionService:
             logging.error(f"Error in add_multiple_text_layers: {str(e)}", exc_info=True)
             raise ValueError(f"Failed to add multiple text layers: {str(e)}")
 
+@dataclass(frozen=True, slots=True)
 class TextLayer:
-    def __init__(self, text: str, position: Dict[str, int], style: Dict):
-        self.text = text
-        self.position = position
-        self.style = style
+    """One text layer for add_multiple_text_layers; slotted since requests can carry many"""
+    text: str
+    position: Dict[str, int]
+    style: Dict
 
     def to_dict(self) -> Dict[str, Any]:
         return {
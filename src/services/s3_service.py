@@ -1,7 +1,10 @@
 import boto3
-from botocore.exceptions import ClientError, NoCredentialsError, EndpointConnectionError
+from boto3.exceptions import S3UploadFailedError
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError, NoCredentialsError, EndpointConnectionError
+from concurrent.futures import Executor
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
 import os
 from dotenv import load_dotenv
 from PIL import Image
@@ -9,6 +12,8 @@ import io
 import uuid
 import logging
 import shutil
+import asyncio
+import functools
 
 load_dotenv()
 
@@ -27,7 +32,11 @@ S3_BUCKET = os.getenv('S3_BUCKET', 'sandbox-opener-bucket')
 S3_REGION = os.getenv('S3_REGION', 'ap-south-1')
 S3_URL = os.getenv('S3_URL', 'https://sandbox-opener-bucket.s3.ap-south-1.amazonaws.com')
 
-# Initialize the S3 client
+# Connections the shared client keeps alive; concurrent uploads from the I/O pool
+# and upload_many would otherwise queue on botocore's default of 10
+MAX_POOL_CONNECTIONS = 32
+
+# Initialize the S3 client once per process; it is thread-safe and reused by every upload
 s3_client = None
 if has_s3:
     try:
@@ -36,7 +45,8 @@ if has_s3:
             's3',
             region_name=S3_REGION,
             aws_access_key_id=os.getenv('S3_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('S3_SECRET_ACCESS_KEY')
+            aws_secret_access_key=os.getenv('S3_SECRET_ACCESS_KEY'),
+            config=Config(max_pool_connections=MAX_POOL_CONNECTIONS)
         )
         # Test connection by listing buckets
         s3_client.list_buckets()
@@ -59,15 +69,55 @@ else:
     logger.warning("AWS S3 credentials not configured properly. Check your environment variables.")
     s3_client = None
 
+# Attempts per upload for transient failures (network errors, S3 5xx), with 2**attempt s backoff
+UPLOAD_ATTEMPTS = 3
+
+def _unwrap_client_error(error: Exception) -> Exception:
+    """
+    The ClientError behind an S3UploadFailedError, which S3Transfer raises for every
+    failed upload_file/upload_fileobj; any other error is returned unchanged
+    """
+    if isinstance(error, S3UploadFailedError) and isinstance(error.__context__, ClientError):
+        return error.__context__
+    return error
+
+def _is_retryable(error: Exception) -> bool:
+    """Network-level failures and server-side errors are worth retrying; 4xx errors are not"""
+    error = _unwrap_client_error(error)
+    if isinstance(error, ClientError):
+        return error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 500) >= 500
+    return isinstance(error, (BotoCoreError, S3UploadFailedError))
+
+async def _call_with_retry(executor: Optional[Executor], func, *args, **kwargs):
+    """
+    Run a blocking boto3 call on executor (default pool when None), retrying transient
+    failures. A failed upload surfaces as its underlying ClientError so callers can
+    branch on the error code.
+    """
+    loop = asyncio.get_running_loop()
+    for attempt in range(UPLOAD_ATTEMPTS):
+        try:
+            return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+        except Exception as e:
+            if attempt == UPLOAD_ATTEMPTS - 1 or not _is_retryable(e):
+                error = _unwrap_client_error(e)
+                if error is e:
+                    raise
+                raise error from e
+            delay = 2 ** attempt
+            logger.warning(f"S3 call failed (attempt {attempt + 1}/{UPLOAD_ATTEMPTS}), retrying in {delay}s: {str(e)}")
+            await asyncio.sleep(delay)
+
 class S3Service:
     @staticmethod
-    async def upload_image(image_path: Path, folder: str = "processed") -> Dict:
+    async def upload_image(image_path: Path, folder: str = "processed", executor: Optional[Executor] = None) -> Dict:
         """
         Upload an image from a file path to S3
         
         Args:
             image_path: Path to the image file
             folder: Optional folder name within the bucket
+            executor: Thread pool for the blocking upload (default pool when None)
             
         Returns:
             Dict containing the URL and key of the uploaded image
@@ -90,8 +140,10 @@ class S3Service:
             s3_key = f"{folder}/{safe_base_name}_{unique_id}{ext}"
             
             try:
-                # Upload the file to S3
-                s3_client.upload_file(
+                # Upload the file to S3 off the event loop; boto3 blocks on network I/O
+                await _call_with_retry(
+                    executor,
+                    s3_client.upload_file,
                     str(image_path),
                     S3_BUCKET,
                     s3_key,
@@ -117,7 +169,9 @@ class S3Service:
                 if error_code == 'AccessDenied':
                     try:
                         logger.info("Attempting upload without ExtraArgs due to AccessDenied error")
-                        s3_client.upload_file(
+                        await _call_with_retry(
+                            executor,
+                            s3_client.upload_file,
                             str(image_path),
                             S3_BUCKET,
                             s3_key
@@ -143,6 +197,90 @@ class S3Service:
             # Fallback to local path for any errors
             return S3Service._handle_local_fallback(image_path, folder)
 
+    @staticmethod
+    async def upload_many(
+        image_paths: List[Path],
+        folder: str = "processed",
+        executor: Optional[Executor] = None,
+        concurrency: int = 8
+    ) -> List[Dict]:
+        """
+        Upload several image files concurrently over the shared client's keep-alive
+        connection pool, at most `concurrency` at a time
+        
+        Returns:
+            One upload_image result per path, in the same order
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def upload(image_path: Path) -> Dict:
+            async with semaphore:
+                return await S3Service.upload_image(image_path, folder, executor)
+        
+        return await asyncio.gather(*[upload(image_path) for image_path in image_paths])
+
+    @staticmethod
+    async def upload_bytes(data: bytes, filename: str, folder: str = "processed", executor: Optional[Executor] = None) -> Dict:
+        """
+        Upload already-encoded image bytes to S3 without writing them to disk first
+        
+        Args:
+            data: Encoded image file contents
+            filename: Name used to build the key; its extension sets the content type
+            folder: Optional folder name within the bucket
+            executor: Thread pool for the blocking upload (default pool when None)
+            
+        Returns:
+            Dict containing the URL and key of the uploaded image
+        """
+        try:
+            if not has_s3 or s3_client is None:
+                # Fallback to local path if S3 is not configured
+                return await S3Service._handle_bytes_local_fallback(data, filename, executor)
+            
+            # Generate a unique filename within the specified folder
+            base_name, ext = os.path.splitext(filename)
+            # Replace spaces with underscores to avoid URL encoding issues
+            safe_base_name = base_name.replace(" ", "_")
+            unique_id = uuid.uuid4().hex[:8]
+            s3_key = f"{folder}/{safe_base_name}_{unique_id}{ext}"
+            
+            try:
+                # Each attempt gets a fresh buffer since a failed upload may have consumed it
+                await _call_with_retry(
+                    executor,
+                    lambda: s3_client.upload_fileobj(
+                        io.BytesIO(data),
+                        S3_BUCKET,
+                        s3_key,
+                        ExtraArgs={
+                            'ContentType': f'image/{ext[1:]}' if ext.startswith('.') else f'image/{ext}'
+                        }
+                    )
+                )
+                
+                # Generate the public URL
+                url = f"{S3_URL}/{s3_key}"
+                logger.info(f"Uploaded image bytes to S3: {url}")
+                
+                return {
+                    "url": url,
+                    "public_id": s3_key
+                }
+            except ClientError as e:
+                error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+                error_message = e.response.get('Error', {}).get('Message', 'Unknown error')
+                logger.error(f"S3 upload error for image bytes: {error_code} - {error_message}")
+                
+                # Fallback to local path
+                logger.warning(f"Falling back to local storage due to S3 error: {error_code}")
+                return await S3Service._handle_bytes_local_fallback(data, filename, executor)
+                
+        except Exception as e:
+            logger.error(f"Failed to upload image bytes to S3: {str(e)}")
+            # Fallback to local path for any errors
+            return await S3Service._handle_bytes_local_fallback(data, filename, executor)
+
     @staticmethod
     async def upload_image_data(image: Image.Image, folder: str = "processed") -> Dict:
         """
@@ -261,6 +399,43 @@ class S3Service:
                 "public_id": os.path.basename(str(image_path))
             }
             
+    @staticmethod
+    async def _handle_bytes_local_fallback(data: bytes, filename: str, executor: Optional[Executor] = None) -> Dict:
+        """Fallback to local storage when S3 upload fails for image bytes; the write runs on executor"""
+        logger.info(f"Using local storage fallback for {filename}")
+        try:
+            # Create a public directory
+            public_dir = Path("uploads/public")
+            public_dir.mkdir(exist_ok=True, parents=True)
+            
+            # Generate a unique filename
+            unique_id = uuid.uuid4().hex[:8]
+            base_name, ext = os.path.splitext(filename)
+            # Replace spaces with underscores to avoid URL encoding issues
+            safe_base_name = base_name.replace(" ", "_")
+            new_filename = f"{safe_base_name}_{unique_id}{ext}"
+            
+            # Write the bytes to the public directory
+            public_path = public_dir / new_filename
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(executor, public_path.write_bytes, data)
+            
+            # Generate a local URL
+            local_url = f"/uploads/public/{new_filename}"
+            logger.info(f"Local fallback for image bytes: Saved to {public_path}, URL: {local_url}")
+            
+            return {
+                "url": local_url,
+                "public_id": new_filename
+            }
+        except Exception as e:
+            logger.error(f"Local fallback for image bytes also failed: {str(e)}")
+            # If all else fails, return a placeholder
+            return {
+                "url": "/uploads/error_image.png",
+                "public_id": "error_image.png"
+            }
+            
     @staticmethod
     async def _handle_image_data_local_fallback(image: Image.Image, folder: str) -> Dict:
         """Fallback to local storage when S3 upload fails for image data"""
@@ -4,18 +4,23 @@ from pathlib import Path
 import logging
 from typing import Tuple, Optional, List, Dict, Any
 import cv2
-import torch
 import os
 import json
 import hashlib
 import base64
 import pickle
-from ultralytics import YOLO
 import time
-import redis
+from src.services.cache import Cache, InMemoryCache
+from dataclasses import dataclass
 
-# SAM imports
-from segment_anything import sam_model_registry, SamPredictor
+@dataclass(frozen=True)
+class ModelStatus:
+    """Which segmentation models are usable, captured once after loading"""
+    sam_available: bool
+    sam_device: str
+    yolo_available: bool
+    yolo_version: str
+    rembg_available: bool
 
 class SegmentationService:
     def __init__(self):
@@ -23,32 +28,38 @@ class SegmentationService:
         self.models_dir = Path("src/models")
         self.models_dir.mkdir(exist_ok=True)
         
-        # Initialize Redis client if available
-        self.redis_client = None
-        if os.getenv("USE_REDIS", "false").lower() == "true":
+        # Result cache; replaced with the app-wide cache (Redis or in-memory) at startup
+        self.cache: Cache = InMemoryCache()
+        
+        # Models are loaded by load_models, off the event loop, once startup
+        # model setup has run; segment requests are refused until then
+        self.yolo_model = None
+        self.sam_predictor = None
+        self.models_loaded = False
+    
+    def load_models(self) -> ModelStatus:
+        """
+        Load whichever of YOLOv8 and SAM are not loaded yet and return the new status.
+        Blocking, and imports Torch, SAM and YOLOv8 on first use; callers run it in an executor.
+        """
+        # Load YOLOv8 model
+        if self.yolo_model is None:
             try:
-                self.redis_client = redis.Redis(
-                    host=os.getenv("REDIS_HOST", "localhost"),
-                    port=int(os.getenv("REDIS_PORT", 6379)),
-                    password=os.getenv("REDIS_PASSWORD", ""),
-                    db=0
-                )
-                # Test connection
-                self.redis_client.ping()
-                logging.info("Redis cache connected for segmentation")
+                from ultralytics import YOLO
+                self.yolo_model = YOLO("yolov8n.pt")  # Using the nano model for faster inference
+                logging.info("YOLOv8 model loaded successfully")
             except Exception as e:
-                logging.warning(f"Redis connection failed: {str(e)}")
-                self.redis_client = None
+                logging.error(f"Failed to load YOLOv8 model: {str(e)}")
+                self.yolo_model = None
         
-        # Load YOLOv8 model
-        try:
-            self.yolo_model = YOLO("yolov8n.pt")  # Using the nano model for faster inference
-            logging.info("YOLOv8 model loaded successfully")
-        except Exception as e:
-            logging.error(f"Failed to load YOLOv8 model: {str(e)}")
-            self.yolo_model = None
+        if self.sam_predictor is None:
+            self._load_sam()
         
-        # Load SAM model
+        self.models_loaded = True
+        return self.get_model_status()
+    
+    def _load_sam(self) -> None:
+        """Load the SAM vit_b predictor, leaving sam_predictor None on failure"""
         try:
             # Check if SAM checkpoint exists, otherwise download
             model_type = "vit_b"  # Use the smallest and fastest model (vit_b)
@@ -68,6 +79,8 @@ class SegmentationService:
             
             if sam_checkpoint.exists():
                 # Load SAM if checkpoint exists
+                import torch
+                from segment_anything import sam_model_registry, SamPredictor
                 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
                 logging.info(f"Loading SAM model on {device} (this may take a moment)...")
                 sam = sam_model_registry[model_type](checkpoint=str(sam_checkpoint))
@@ -81,6 +94,26 @@ class SegmentationService:
             logging.error(f"Failed to load SAM model: {str(e)}")
             self.sam_predictor = None
     
+    def get_model_status(self) -> ModelStatus:
+        """Build a ModelStatus snapshot from the loaded models"""
+        sam_device = "unknown"
+        if self.sam_predictor is not None and hasattr(self.sam_predictor.model, "device"):
+            sam_device = str(self.sam_predictor.model.device)
+
+        try:
+            from rembg import remove
+            rembg_available = True
+        except ImportError:
+            rembg_available = False
+
+        return ModelStatus(
+            sam_available=self.sam_predictor is not None,
+            sam_device=sam_device,
+            yolo_available=self.yolo_model is not None,
+            yolo_version=str(getattr(self.yolo_model, "version", "unknown")),
+            rembg_available=rembg_available
+        )
+
     def _get_cache_key(self, image_path: Path) -> str:
         """Generate a cache key for an image based on its content hash"""
         try:
@@ -92,11 +125,8 @@ class SegmentationService:
             # Fallback to using the filename
             return f"segmentation:{image_path.name}"
     
-    def _cache_result(self, key: str, fore_path: Path, back_path: Path, mask_path: Path) -> bool:
-        """Cache segmentation results in Redis"""
-        if not self.redis_client:
-            return False
-        
+    async def _cache_result(self, key: str, fore_path: Path, back_path: Path, mask_path: Path) -> bool:
+        """Cache segmentation results"""
         try:
             # Store paths in Redis (not the actual images to save memory)
             cache_data = {
@@ -107,10 +137,10 @@ class SegmentationService:
             }
             
             # Set with 1 hour expiration
-            self.redis_client.setex(
+            await self.cache.set(
                 key,
-                3600,  # 1 hour expiration
-                json.dumps(cache_data)
+                json.dumps(cache_data),
+                3600  # 1 hour expiration
             )
             
             logging.info(f"Cached segmentation results for {key}")
@@ -119,13 +149,10 @@ class SegmentationService:
             logging.error(f"Failed to cache results: {str(e)}")
             return False
     
-    def _get_cached_result(self, key: str) -> Optional[Tuple[Path, Path, Path]]:
-        """Retrieve cached segmentation results from Redis if available"""
-        if not self.redis_client:
-            return None
-        
+    async def _get_cached_result(self, key: str) -> Optional[Tuple[Path, Path, Path]]:
+        """Retrieve cached segmentation results if available"""
         try:
-            cached = self.redis_client.get(key)
+            cached = await self.cache.get(key)
             if not cached:
                 return None
             
@@ -141,7 +168,7 @@ class SegmentationService:
                 return fore_path, back_path, mask_path
             else:
                 # Files don't exist anymore, invalidate cache
-                self.redis_client.delete(key)
+                await self.cache.delete(key)
                 return None
         except Exception as e:
             logging.error(f"Failed to retrieve from cache: {str(e)}")
@@ -232,7 +259,7 @@ class SegmentationService:
             logging.error(f"Mask post-processing failed: {str(e)}")
             return mask  # Return original mask if processing fails
 
-    async def segment_image(self, image_path: Path) -> Tuple[Path, Path, Path]:
+    async def segment_image(self, image_path: Path, output_dir: Optional[Path] = None) -> Tuple[Path, Path, Path]:
         try:
             start_time = time.time()
             logging.info(f"Starting segmentation for image: {image_path}")
@@ -266,9 +293,9 @@ class SegmentationService:
                 processing_path = image_path
                 is_resized = False
             
-            # Check cache first if Redis is available
+            # Check cache first
             cache_key = self._get_cache_key(image_path)
-            cached_result = self._get_cached_result(cache_key)
+            cached_result = await self._get_cached_result(cache_key)
             if cached_result:
                 logging.info(f"Cache hit: {cache_key}")
                 return cached_result
@@ -355,8 +382,8 @@ class SegmentationService:
             background.putalpha(alpha_bg)
             
             # Save results
-            processed_dir = Path("uploads/processed")
-            processed_dir.mkdir(exist_ok=True)
+            processed_dir = output_dir or Path("uploads/processed")
+            processed_dir.mkdir(parents=True, exist_ok=True)
             base_name = image_path.stem
             
             mask_path = processed_dir / f"{base_name}_mask.png"
@@ -379,8 +406,8 @@ class SegmentationService:
                 except Exception as e:
                     logging.warning(f"Failed to remove temporary file: {e}")
             
-            # Cache the results if Redis is available
-            self._cache_result(cache_key, fore_path, back_path, mask_path)
+            # Cache the results
+            await self._cache_result(cache_key, fore_path, back_path, mask_path)
             
             end_time = time.time()
             logging.info(f"Segmentation completed in {end_time - start_time:.2f} seconds")
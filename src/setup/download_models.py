@@ -1,61 +1,72 @@
+import asyncio
 import os
-import requests
 import logging
 from pathlib import Path
-import sys
-from tqdm import tqdm
+import aiofiles
+import httpx
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def download_file(url, output_path):
+MODELS_DIR = Path("src/models")
+FONTS_DIR = Path("assets/fonts")
+
+# SAM checkpoint - use vit_b (smaller and faster) instead of vit_h
+SAM_CHECKPOINT = MODELS_DIR / "sam_vit_b_01ec64.pth"
+SAM_URL = "https://dl.fbaipublicfiles.com/segment_anything/sam_vit_b_01ec64.pth"
+
+# Fonts to download
+FONTS = {
+    "Anton-Regular.ttf": "https://github.com/google/fonts/raw/main/ofl/anton/Anton-Regular.ttf",
+    "SixCaps.ttf": "https://github.com/google/fonts/raw/main/ofl/sixcaps/SixCaps.ttf",
+}
+
+async def download_file(client: httpx.AsyncClient, url: str, output_path: Path) -> bool:
     """
-    Download a file with progress bar
+    Stream a file to disk. Writes to a .part file first so an interrupted
+    download is never mistaken for a complete one.
     """
+    part_path = output_path.with_name(output_path.name + ".part")
     try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        
-        total_size = int(response.headers.get('content-length', 0))
-        block_size = 1024  # 1 KB
-        
-        with open(output_path, 'wb') as file, tqdm(
-            desc=os.path.basename(output_path),
-            total=total_size,
-            unit='B',
-            unit_scale=True,
-            unit_divisor=1024,
-        ) as bar:
-            for data in response.iter_content(block_size):
-                file.write(data)
-                bar.update(len(data))
-                
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            async with aiofiles.open(part_path, 'wb') as file:
+                async for data in response.aiter_bytes(1024 * 1024):
+                    await file.write(data)
+
+        os.replace(part_path, output_path)
         logger.info(f"Downloaded {os.path.basename(output_path)} successfully")
         return True
     except Exception as e:
-        logger.error(f"Download failed: {str(e)}")
+        logger.error(f"Download of {os.path.basename(output_path)} failed: {str(e)}")
+        if part_path.exists():
+            part_path.unlink()
         return False
 
-def setup_sam_model():
+def get_pending_downloads():
     """
-    Download SAM model checkpoint if needed
+    List (url, path) pairs for the SAM checkpoint and fonts that are not on disk yet
     """
-    models_dir = Path("src/models")
-    models_dir.mkdir(exist_ok=True, parents=True)
-    
-    # SAM checkpoint - use vit_b (smaller and faster) instead of vit_h
-    sam_checkpoint = models_dir / "sam_vit_b_01ec64.pth"
-    sam_url = "https://dl.fbaipublicfiles.com/segment_anything/sam_vit_b_01ec64.pth"
-    
-    if not sam_checkpoint.exists():
+    MODELS_DIR.mkdir(exist_ok=True, parents=True)
+    FONTS_DIR.mkdir(exist_ok=True, parents=True)
+
+    pending = []
+    if not SAM_CHECKPOINT.exists():
         logger.info("SAM model checkpoint not found, downloading vit_b model (smaller, faster)...")
-        if download_file(sam_url, sam_checkpoint):
-            logger.info("SAM model checkpoint downloaded successfully")
-        else:
-            logger.warning("Failed to download SAM model checkpoint")
+        pending.append((SAM_URL, SAM_CHECKPOINT))
     else:
         logger.info("SAM vit_b model checkpoint already exists")
 
+    for font_name, font_url in FONTS.items():
+        font_path = FONTS_DIR / font_name
+        if not font_path.exists():
+            logger.info(f"Downloading font: {font_name}")
+            pending.append((font_url, font_path))
+        else:
+            logger.info(f"Font {font_name} already exists")
+
+    return pending
+
 def setup_yolo_model():
     """
     Download YOLOv8 model if needed (handled by ultralytics library)
@@ -63,7 +74,7 @@ def setup_yolo_model():
     try:
         from ultralytics import YOLO
         logger.info("Checking YOLOv8 model...")
-        
+
         # Force download by loading the model
         # This will trigger the download if not present
         model = YOLO("yolov8n.pt")
@@ -71,41 +82,38 @@ def setup_yolo_model():
     except Exception as e:
         logger.error(f"Error setting up YOLOv8 model: {str(e)}")
 
-def download_fonts():
+async def setup_models_async(executor=None):
     """
-    Download required fonts
+    Setup all required models, fetching every missing file concurrently over one
+    HTTP/2 connection pool. The blocking YOLOv8 setup runs on `executor`
+    (default thread pool when None) alongside the downloads.
     """
-    fonts_dir = Path("assets/fonts")
-    fonts_dir.mkdir(exist_ok=True, parents=True)
-    
-    # Define fonts to download
-    fonts = {
-        "Anton-Regular.ttf": "https://github.com/google/fonts/raw/main/ofl/anton/Anton-Regular.ttf",
-        "SixCaps.ttf": "https://github.com/google/fonts/raw/main/ofl/sixcaps/SixCaps.ttf",
-    }
-    
-    for font_name, font_url in fonts.items():
-        font_path = fonts_dir / font_name
-        if not font_path.exists():
-            logger.info(f"Downloading font: {font_name}")
-            if download_file(font_url, font_path):
-                logger.info(f"Font {font_name} downloaded successfully")
-            else:
-                logger.warning(f"Failed to download font {font_name}")
-        else:
-            logger.info(f"Font {font_name} already exists")
+    logger.info("Starting model setup")
+
+    pending = get_pending_downloads()
+    loop = asyncio.get_running_loop()
+    async with httpx.AsyncClient(
+        http2=True,
+        timeout=300,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=8)
+    ) as client:
+        results = await asyncio.gather(
+            loop.run_in_executor(executor, setup_yolo_model),
+            *[download_file(client, url, path) for url, path in pending]
+        )
+
+    failed = [str(path) for (url, path), ok in zip(pending, results[1:]) if not ok]
+    if failed:
+        raise RuntimeError(f"Failed to download: {', '.join(failed)}")
+
+    logger.info("Model setup complete")
 
 def setup_models():
     """
     Main function to setup all required models
     """
-    logger.info("Starting model setup")
-    
-    setup_sam_model()
-    setup_yolo_model()
-    download_fonts()
-    
-    logger.info("Model setup complete")
+    asyncio.run(setup_models_async())
 
 if __name__ == "__main__":
-    setup_models() 
\ No newline at end of file
+    setup_models()
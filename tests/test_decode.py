@@ -0,0 +1,57 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.services.composition import _decode_rgba
+
+
+def _encode(image: Image.Image, fmt: str, **params) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+def _rgba_source() -> Image.Image:
+    pixels = np.random.default_rng(0).integers(0, 256, (20, 30, 4), dtype=np.uint8)
+    # Pin the values used as transparency keys below so every keyed case has keyed pixels
+    pixels[0, :3, :3] = (7, 7, 7)
+    return Image.fromarray(pixels, "RGBA")
+
+
+def _cases():
+    rgba = _rgba_source()
+    rgb = rgba.convert("RGB")
+    gray = rgba.convert("L")
+    wide = Image.fromarray(np.random.default_rng(1).integers(0, 65536, (20, 30), dtype=np.uint16))
+    return {
+        "png_rgba": _encode(rgba, "PNG"),
+        "png_rgb": _encode(rgb, "PNG"),
+        "png_rgb_trns": _encode(rgb, "PNG", transparency=(7, 7, 7)),
+        "png_l": _encode(gray, "PNG"),
+        "png_l_trns": _encode(gray, "PNG", transparency=7),
+        "png_la": _encode(rgba.convert("LA"), "PNG"),
+        "png_p_trns": _encode(rgb.convert("P"), "PNG", transparency=0),
+        "png_1bit_trns": _encode(rgba.convert("1"), "PNG", transparency=0),
+        "png_16bit": _encode(wide, "PNG"),
+        "tiff_rgba": _encode(rgba, "TIFF"),
+        "tiff_la": _encode(rgba.convert("LA"), "TIFF"),
+        "jpeg_cmyk": _encode(rgb.convert("CMYK"), "JPEG", quality=95),
+        "webp_rgba": _encode(rgba, "WEBP", lossless=True),
+        "bmp_rgb": _encode(rgb, "BMP"),
+    }
+
+
+CASES = _cases()
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_decode_rgba_matches_pil(name):
+    content = CASES[name]
+    expected = np.asarray(Image.open(BytesIO(content)).convert("RGBA"))
+
+    actual = _decode_rgba(content)
+
+    assert actual.dtype == np.uint8
+    np.testing.assert_array_equal(actual, expected)
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from boto3.exceptions import S3UploadFailedError
+from botocore.exceptions import ClientError
+
+from src.services import s3_service
+
+
+class FakeS3Client:
+    """Stands in for boto3's client; upload_file fails the way S3Transfer does"""
+
+    def __init__(self, status: int, code: str):
+        self.status = status
+        self.code = code
+        self.calls = 0
+
+    def upload_file(self, filename, bucket, key, ExtraArgs=None):
+        self.calls += 1
+        try:
+            raise ClientError(
+                {"Error": {"Code": self.code, "Message": "test"}, "ResponseMetadata": {"HTTPStatusCode": self.status}},
+                "PutObject"
+            )
+        except ClientError as e:
+            raise S3UploadFailedError(f"Failed to upload {filename} to {bucket}/{key}: {e}")
+
+
+@pytest.fixture
+def fake_s3(monkeypatch, tmp_path):
+    async def no_sleep(delay):
+        pass
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(s3_service, "has_s3", True)
+    monkeypatch.setattr(s3_service.asyncio, "sleep", no_sleep)
+
+    def install(status: int, code: str) -> FakeS3Client:
+        client = FakeS3Client(status, code)
+        monkeypatch.setattr(s3_service, "s3_client", client)
+        return client
+
+    return install
+
+
+def _upload(tmp_path) -> dict:
+    image_path = tmp_path / "image.png"
+    image_path.write_bytes(b"png")
+    return asyncio.run(s3_service.S3Service.upload_image(image_path))
+
+
+def test_upload_file_403_is_attempted_once(fake_s3, tmp_path):
+    client = fake_s3(403, "InvalidAccessKeyId")
+
+    result = _upload(tmp_path)
+
+    assert client.calls == 1
+    assert result["url"].startswith("/uploads/public/")
+
+
+def test_upload_file_5xx_is_retried(fake_s3, tmp_path):
+    client = fake_s3(503, "SlowDown")
+
+    _upload(tmp_path)
+
+    assert client.calls == s3_service.UPLOAD_ATTEMPTS
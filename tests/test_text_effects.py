@@ -0,0 +1,69 @@
+import math
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from src.services.composition import _composite_layer, _render_glyph_mask, _render_text_sprite
+
+FONT_PATH = Path("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")
+TEXT = "Hgjy Wo"
+ANCHOR = (200, 100)
+COLOR = "#FFFFFF"
+
+pytestmark = pytest.mark.skipif(not FONT_PATH.exists(), reason="DejaVu Sans Bold not installed")
+
+
+def _opaque_background() -> Image.Image:
+    pixels = np.random.default_rng(0).integers(0, 256, (200, 400, 4), dtype=np.uint8)
+    pixels[..., 3] = 255
+    return Image.fromarray(pixels, "RGBA")
+
+
+def _reference_render(canvas, font, effects):
+    """The pre-sprite renderer: every pass pasted through the glyph mask straight onto the background"""
+    left, top, right, bottom = ImageDraw.Draw(canvas).textbbox((0, 0), TEXT, font=font)
+    height = bottom - top
+    x = ANCHOR[0] - (right - left) // 2
+    y = ANCHOR[1] - height // 2 - int(height * 0.375)
+    mask, (mask_dx, mask_dy) = _render_glyph_mask(TEXT, font)
+
+    def stamp(px, py, fill):
+        canvas.paste(fill, (px + mask_dx, py + mask_dy), mask)
+
+    if "type" not in effects:
+        offset = effects["shadow"]["offset"]
+        stamp(x + offset[0], y + offset[1], effects["shadow"]["color"])
+    elif effects["type"] == "shadow":
+        settings = effects["settings"]
+        stamp(x + settings["offset"][0], y + settings["offset"][1], settings["color"])
+    else:
+        settings = effects["settings"]
+        gradient = settings["color_gradient"]
+        dx = math.cos(math.radians(settings["angle"])) * settings["distance"]
+        dy = math.sin(math.radians(settings["angle"])) * settings["distance"]
+        for i in range(settings["layers"], 0, -1):
+            index = min(int((i / settings["layers"]) * (len(gradient) - 1)), len(gradient) - 1)
+            stamp(x - int(i * dx), y - int(i * dy), gradient[index])
+    stamp(x, y, COLOR)
+
+
+@pytest.mark.parametrize("effects", [
+    {"type": "shadow", "settings": {"offset": [3, 3], "color": "#000000", "opacity": 1.0, "blur": 0}},
+    {"type": "3d_depth", "settings": {"layers": 6, "angle": 45, "distance": 2, "color_gradient": ["#333333", "#666666", "#999999"]}},
+    {"shadow": {"offset": (4, 4), "color": "#FF0000"}},
+], ids=["hard_shadow", "3d_depth", "legacy_shadow"])
+def test_sprite_matches_direct_render_on_opaque_background(effects):
+    font = ImageFont.truetype(str(FONT_PATH), 60)
+
+    expected = _opaque_background()
+    _reference_render(expected, font, effects)
+
+    actual = _opaque_background()
+    layer, (offset_x, offset_y) = _render_text_sprite(TEXT, font, COLOR, effects)
+    _composite_layer(actual, layer, ANCHOR[0] + offset_x, ANCHOR[1] + offset_y)
+
+    diff = np.abs(np.asarray(expected, dtype=np.int16) - np.asarray(actual, dtype=np.int16))
+    # Alpha compositing and masked pastes round differently by at most one level
+    assert diff.max() <= 1